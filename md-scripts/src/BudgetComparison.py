@@ -0,0 +1,151 @@
+# Compare planned spending per expense category with a Moneydance budget
+import logging
+from datetime import date
+from decimal import Decimal
+
+from com.infinitekind.moneydance.model import Account, AccountBook, Budget, BudgetItem
+from typing import Dict, List, Optional, Tuple
+
+from ReminderSchedule import ReminderSchedule
+
+
+class BudgetComparison(object):
+    """Class to index one budget's amount per category over the horizon once,
+    for a single linear join against planned spending"""
+
+    OVER = "over"
+    UNDER = "under"
+    UNBUDGETED = "unbudgeted"
+
+    # budget item interval constant names, how many intervals make a year, and
+    # the months and days from one interval start to the next with how many
+    # intervals each such step holds; no step for an item that does not repeat
+    INTERVALS_PER_YEAR = (
+        ("INTERVAL_DAILY", 365, (0, 1, 1)), ("INTERVAL_WEEKLY", 52, (0, 7, 1)),
+        ("INTERVAL_BI_WEEKLY", 26, (0, 14, 1)), ("INTERVAL_SEMI_MONTHLY", 24, (1, 0, 2)),
+        ("INTERVAL_MONTHLY", 12, (1, 0, 1)), ("INTERVAL_BI_MONTHLY", 6, (2, 0, 1)),
+        ("INTERVAL_TRI_MONTHLY", 4, (3, 0, 1)), ("INTERVAL_SEMI_ANNUALLY", 2, (6, 0, 1)),
+        ("INTERVAL_ANNUALLY", 1, (12, 0, 1)), ("INTERVAL_NO_REPEAT", 1, None))
+
+    def __init__(self, budget, startDate, endDate):
+        # type: (Budget, date, date) -> None
+        self.budget = budget
+        self.name = budget.getName()  # type: str
+        self.startDate = startDate
+        self.endDate = endDate
+        self.intervals = dict((getattr(BudgetItem, name), (count, step))
+                              for name, count, step in BudgetComparison.INTERVALS_PER_YEAR
+                              if hasattr(BudgetItem, name))  # type: Dict[int, Tuple[int, Optional[Tuple[int, int, int]]]]
+        self.budgetIndex = self.indexBudget()  # type: Dict[Account, Decimal]
+    # end __init__(Budget, date, date)
+
+    @staticmethod
+    def getBudgets(accountBook, budgetName=None):
+        # type: (AccountBook, Optional[str]) -> List[Budget]
+        """Get the book's budgets, or only the one with this name."""
+        return [budget for budget in accountBook.getBudgets().getAllBudgets()
+                if budgetName is None or budget.getName() == budgetName]
+    # end getBudgets(AccountBook, Optional[str])
+
+    def indexBudget(self):
+        # type: () -> Dict[Account, Decimal]
+        """Hash each expense category to the amount its budget items give it
+        within our horizon: a whole year's worth from an item covering all of
+        it, otherwise only the intervals the item starts within it."""
+        minorTotals = {}  # type: Dict[Account, int]
+
+        for item in self.budget.getItemList().getAllItems():
+            category = item.getTransferAccount()  # type: Account
+
+            if category is not None \
+                    and category.getAccountType() != Account.AccountType.EXPENSE:
+                continue
+            interval = self.intervals.get(item.getInterval())
+
+            if category is None or interval is None:
+                logging.warning("Skipping budget %s item with interval %s for %s.",
+                                self.name, item.getInterval(), category)
+                continue
+            numIntervals = self.countIntervals(
+                item.getIntervalStartDate(), item.getIntervalEndDate(), *interval)
+
+            if numIntervals:
+                minorTotals[category] = minorTotals.get(category, 0) \
+                    + item.getAmount() * numIntervals
+        # end for
+
+        return dict((category, Decimal(total).scaleb(
+            -category.getCurrencyType().getDecimalPlaces()))
+            for category, total in minorTotals.items())
+    # end indexBudget()
+
+    def countIntervals(self, itemStartInt, itemEndInt, perYear, step):
+        # type: (int, int, int, Optional[Tuple[int, int, int]]) -> int
+        """Count the intervals of a budget item with these interval start and
+        end date ints that fall in our horizon."""
+        itemStart = ReminderSchedule.intToDate(itemStartInt) \
+            if ReminderSchedule.isValidDateInt(itemStartInt) else None
+        itemEnd = ReminderSchedule.intToDate(itemEndInt) + ReminderSchedule.ONE_DAY \
+            if ReminderSchedule.isValidDateInt(itemEndInt) else None
+
+        if (itemStart is None or itemStart <= self.startDate) \
+                and (itemEnd is None or itemEnd >= self.endDate):
+            return perYear
+        lo = max(self.startDate, itemStart or self.startDate)
+        hi = min(self.endDate, itemEnd or self.endDate)
+        anchor = itemStart or self.startDate
+
+        if lo >= hi:
+            return 0
+
+        if step is None:
+            return 1 if lo <= anchor < hi else 0
+        months, days, perStep = step
+        numSteps = 0
+
+        if days:
+            # interval starts before hi less those before lo, both from anchor
+            numSteps = ((hi - anchor).days + days - 1) // days \
+                - ((lo - anchor).days + days - 1) // days
+        else:
+            k = 0
+            intervalStart = anchor
+
+            while intervalStart < hi:
+                if intervalStart >= lo:
+                    numSteps += 1
+                k += 1
+                intervalStart = ReminderSchedule.addMonths(anchor, k * months)
+            # end while
+
+        return numSteps * perStep
+    # end countIntervals(int, int, int, Optional[Tuple[int, int, int]])
+
+    def compare(self, plannedByAccount, tolerance=Decimal(0)):
+        # type: (Dict[Account, Decimal], Decimal) -> List[Tuple[str, Decimal, Decimal, str]]
+        """Get the full name, planned and budgeted amounts and over or under flag
+        of each category in either, sorted by name; a difference within the
+        tolerance fraction of the budget is not flagged."""
+        rows = []
+
+        for category in set(plannedByAccount) | set(self.budgetIndex):
+            planned = plannedByAccount.get(category, Decimal(0))
+            budgeted = self.budgetIndex.get(category)
+
+            if budgeted is None:
+                flag = BudgetComparison.UNBUDGETED if planned else ""
+                budgeted = Decimal(0)
+            elif planned > budgeted * (1 + tolerance):
+                flag = BudgetComparison.OVER
+            elif planned < budgeted * (1 - tolerance):
+                flag = BudgetComparison.UNDER
+            else:
+                flag = ""
+            rows.append((category.getFullAccountName(), planned, budgeted, flag))
+        # end for
+        rows.sort(key=lambda row: row[0])
+
+        return rows
+    # end compare(Dict[Account, Decimal], Decimal)
+
+# end class BudgetComparison
@@ -0,0 +1,30 @@
+# Where the scripts keep files between runs
+import os
+
+from com.infinitekind.moneydance.model import AccountBook
+
+
+class CacheDir(object):
+    """Class to name files in the user's cache directory for these scripts"""
+
+    PATH = os.path.join(os.path.expanduser("~"), ".mdscripts")
+
+    @staticmethod
+    def bookPath(prefix, accountBook, extension):
+        # type: (str, AccountBook, str) -> str
+        """Get the path of an account book's file of one kind, e.g. prefix-uuid.json."""
+        return os.path.join(CacheDir.PATH, "{}-{}.{}".format(
+            prefix, accountBook.getFileUUID(), extension))
+    # end bookPath(str, AccountBook, str)
+
+    @staticmethod
+    def makeParent(path):
+        # type: (str) -> None
+        """Create the directory a file goes in, when it does not exist yet."""
+        parent = os.path.dirname(path)
+
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent)
+    # end makeParent(str)
+
+# end class CacheDir
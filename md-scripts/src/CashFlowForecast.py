@@ -0,0 +1,141 @@
+# Project day-by-day account balances from every reminder, not just spending
+import heapq
+from array import array
+from datetime import date, timedelta
+
+from com.infinitekind.moneydance.model import AbstractTxn, Account, AccountBook
+from com.infinitekind.moneydance.model import ParentTxn, Reminder, ReminderSet
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ReminderSchedule import ReminderSchedule
+
+
+class AccountProjection(object):
+    """Class to hold the projected daily balances of one account"""
+
+    def __init__(self, account, numDays):
+        # type: (Account, int) -> None
+        self.account = account
+        self.startBalance = account.getBalance()  # type: int
+        self.balance = self.startBalance
+        self.decimalPlaces = account.getCurrencyType().getDecimalPlaces()  # type: int
+        # element i holds the balance at the end of day i
+        self.dailyBalances = array("l", [0]) * numDays
+        self.filledDays = 0
+        self.lowBalance = self.startBalance
+        self.lowDate = None  # type: Optional[date]
+    # end __init__(Account, int)
+
+    def advanceTo(self, dayIndex, startDate):
+        # type: (int, date) -> None
+        """Record the current balance for each day before dayIndex not yet filled."""
+        while self.filledDays < dayIndex:
+            self.dailyBalances[self.filledDays] = self.balance
+
+            if self.balance < self.lowBalance:
+                self.lowBalance = self.balance
+                self.lowDate = startDate + timedelta(days=self.filledDays)
+            self.filledDays += 1
+        # end while
+    # end advanceTo(int, date)
+
+# end class AccountProjection
+
+
+class CashFlowForecast(object):
+    """Class to project account balances by merging dated events from every
+    reminder, generated lazily so memory follows the number of reminders"""
+
+    def __init__(self, accountBook, startDate, endDate,
+                 projectedTypes=(Account.AccountType.BANK,)):
+        # type: (AccountBook, date, date, Tuple[Account.AccountType, ...]) -> None
+        self.accountBook = accountBook
+        self.startDate = startDate
+        self.endDate = endDate
+        self.numDays = (endDate - startDate).days
+        self.projectedTypes = projectedTypes
+        self.projections = {}  # type: Dict[str, AccountProjection]
+        self.numEvents = 0
+    # end __init__(AccountBook, date, date, Tuple[Account.AccountType, ...])
+
+    def getProjection(self, account):
+        # type: (Account) -> Optional[AccountProjection]
+        """Get the projection for an account, or None when we don't project its type."""
+        if account.getAccountType() not in self.projectedTypes:
+            return None
+        uuid = account.getUUID()  # type: str
+        projection = self.projections.get(uuid)
+
+        if projection is None:
+            projection = self.projections[uuid] = AccountProjection(account, self.numDays)
+
+        return projection
+    # end getProjection(Account)
+
+    def getBalanceChanges(self, remind):
+        # type: (Reminder) -> List[Tuple[str, int]]
+        """Get the net change, in minor units, to each projected account each
+        time a reminder occurs."""
+        txn = remind.getTransaction()  # type: ParentTxn
+
+        if txn is None:
+            return []
+        changes = {}  # type: Dict[str, int]
+        parent = self.getProjection(txn.getAccount())
+
+        for i in range(txn.getOtherTxnCount()):
+            other = txn.getOtherTxn(i)  # type: AbstractTxn
+
+            if parent:
+                uuid = parent.account.getUUID()
+                changes[uuid] = changes.get(uuid, 0) - other.getAmount()
+            projection = self.getProjection(other.getAccount())
+
+            if projection:
+                uuid = projection.account.getUUID()
+                changes[uuid] = changes.get(uuid, 0) + other.getValue()
+        # end for
+
+        return [(uuid, change) for uuid, change in sorted(changes.items()) if change]
+    # end getBalanceChanges(Reminder)
+
+    def iterEvents(self, remind):
+        # type: (Reminder) -> Iterator[Tuple[date, str, int]]
+        """Generate the date, account UUID and balance change of each event
+        from one reminder, in date order."""
+        changes = self.getBalanceChanges(remind)
+
+        if changes:
+            schedule = ReminderSchedule(remind)
+
+            for occurrence in schedule.iterOccurrences(self.startDate, self.endDate):
+                for uuid, change in changes:
+                    yield occurrence, uuid, change
+                # end for
+            # end for
+    # end iterEvents(Reminder)
+
+    def project(self):
+        # type: () -> List[AccountProjection]
+        """Apply every reminder's events in date order and get the projection
+        of each account they touch."""
+        reminderSet = self.accountBook.getReminders()  # type: ReminderSet
+        eventStreams = [self.iterEvents(remind) for remind in reminderSet.getAllReminders()]
+
+        for occurrence, uuid, change in heapq.merge(*eventStreams):
+            projection = self.projections[uuid]
+            # balances before today's events are final
+            projection.advanceTo((occurrence - self.startDate).days, self.startDate)
+            projection.balance += change
+            self.numEvents += 1
+        # end for
+
+        for projection in self.projections.values():
+            projection.advanceTo(self.numDays, self.startDate)
+        # end for
+
+        return sorted(self.projections.values(),
+                      key=lambda projection: projection.account.getFullAccountName())
+    # end project()
+
+# end class CashFlowForecast
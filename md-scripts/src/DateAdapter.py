@@ -0,0 +1,115 @@
+# Hand dates to Moneydance without a new Calendar or a coercion on every call
+import logging
+import threading
+from calendar import monthrange
+from datetime import date
+from time import time
+
+from com.infinitekind.moneydance.model import Reminder
+from java.util import Calendar
+from typing import Iterator
+
+
+class DateAdapter(object):
+    """Class to convert dates to the java.util.Calendar Moneydance wants,
+    reusing one mutable Calendar per thread"""
+
+    threadCalendars = threading.local()
+
+    @staticmethod
+    def threadCalendar():
+        # type: () -> Calendar
+        """Get this thread's reusable Calendar; callers must not hold on to it."""
+        cal = getattr(DateAdapter.threadCalendars, "cal", None)
+
+        if cal is None:
+            cal = DateAdapter.threadCalendars.cal = Calendar.getInstance()
+            cal.clear()
+
+        return cal
+    # end threadCalendar()
+
+    @staticmethod
+    def calendarFor(dt):
+        # type: (date) -> Calendar
+        """Get this thread's reusable Calendar set to the start of a date."""
+        cal = DateAdapter.threadCalendar()
+        cal.set(dt.year, dt.month - 1, dt.day)
+
+        return cal
+    # end calendarFor(date)
+
+    @staticmethod
+    def toCalendar(dt):
+        # type: (date) -> Calendar
+        """Get a new java.util.Calendar set to the start of a date, for callers
+        that keep it."""
+        cal = Calendar.getInstance()
+        cal.clear()
+        cal.set(dt.year, dt.month - 1, dt.day)
+
+        return cal
+    # end toCalendar(date)
+
+    @staticmethod
+    def iterCalendars(startDate, endDate):
+        # type: (date, date) -> Iterator[Calendar]
+        """Generate a Calendar set to each day in [startDate, endDate), advancing
+        one Calendar in place; each scan gets its own, so interleaved scans on
+        one thread cannot move each other's."""
+        cal = DateAdapter.toCalendar(startDate)
+
+        for _ in range((endDate - startDate).days):
+            yield cal
+            cal.add(Calendar.DAY_OF_MONTH, 1)
+        # end for
+    # end iterCalendars(date, date)
+
+    @staticmethod
+    def iterDateInts(startDateInt, endDateInt):
+        # type: (int, int) -> Iterator[int]
+        """Generate each yyyymmdd date int in [startDateInt, endDateInt) using
+        only integer arithmetic."""
+        year, month, day = startDateInt // 10000, startDateInt // 100 % 100, startDateInt % 100
+        monthDays = monthrange(year, month)[1]
+        dateInt = startDateInt
+
+        while dateInt < endDateInt:
+            yield dateInt
+
+            if day < monthDays:
+                day += 1
+                dateInt += 1
+            else:
+                day = 1
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                monthDays = monthrange(year, month)[1]
+                dateInt = year * 10000 + month * 100 + day
+        # end while
+    # end iterDateInts(int, int)
+
+    @staticmethod
+    def benchmarkProbes(reminder, startDate, endDate):
+        # type: (Reminder, date, date) -> None
+        """Log the cost per occursOnDate probe over [startDate, endDate) when
+        passing a Python date against advancing a reused Calendar."""
+        numDays = max((endDate - startDate).days, 1)
+        curDate = startDate
+        startTime = time()
+
+        while curDate < endDate:
+            reminder.occursOnDate(curDate)
+            curDate = date.fromordinal(curDate.toordinal() + 1)
+        # end while
+        dateTime = time() - startTime
+        startTime = time()
+
+        for cal in DateAdapter.iterCalendars(startDate, endDate):
+            reminder.occursOnDate(cal)
+        # end for
+        calendarTime = time() - startTime
+        logging.info("Probe cost over %d days: %.2f us passing dates, %.2f us reusing a Calendar.",
+                     numDays, dateTime * 1e6 / numDays, calendarTime * 1e6 / numDays)
+    # end benchmarkProbes(Reminder, date, date)
+
+# end class DateAdapter
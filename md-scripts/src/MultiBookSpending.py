@@ -0,0 +1,146 @@
+# Combine the planned spending of several account books
+import logging
+from decimal import Decimal
+from time import time
+
+from com.infinitekind.moneydance.model import AccountBook
+from java.io import File
+from java.util.concurrent import Callable, Executors
+from typing import Dict, List, Optional, Tuple
+
+from OccurrenceCache import OccurrenceCache
+from ReminderGroup import ReminderGroup
+
+
+class BookWorker(Callable):
+    """Class to open an account book and get its planned spending on a
+    thread pool thread"""
+
+    def __init__(self, folder, template):
+        # type: (str, ReminderAccessor) -> None
+        self.folder = folder
+        self.template = template
+        self.bookName = folder
+        self.groups = []  # type: List[ReminderGroup]
+    # end __init__(str, ReminderAccessor)
+
+    def call(self):
+        # type: () -> BookWorker
+        """Get the book's planned spending with our template's horizon and
+        filters, then unload the book."""
+        accountBook = AccountBook.accountBookForFolder(File(self.folder))  # type: AccountBook
+
+        try:
+            # each book has its own cache file, so workers never share one
+            occurrenceCache = OccurrenceCache.forBook(accountBook)
+            occurrenceCache.load()
+            self.computeBook(accountBook, occurrenceCache)
+        finally:
+            accountBook.cleanUp()
+
+        return self
+    # end call()
+
+    def computeBook(self, accountBook, occurrenceCache):
+        # type: (AccountBook, Optional[OccurrenceCache]) -> None
+        """Get an open book's planned spending with our template's horizon
+        and filters, then save its occurrence cache."""
+        self.bookName = accountBook.getName()
+        self.groups = self.template.copyFor(accountBook, occurrenceCache).getPlannedSpending()
+
+        if occurrenceCache:
+            occurrenceCache.save()
+    # end computeBook(AccountBook, Optional[OccurrenceCache])
+
+# end class BookWorker
+
+
+class OpenBookWorker(BookWorker):
+    """Class to get the planned spending of an account book that is already
+    open on a thread pool thread, leaving the book open"""
+
+    def __init__(self, accountBook, occurrenceCache, template):
+        # type: (AccountBook, Optional[OccurrenceCache], ReminderAccessor) -> None
+        super(OpenBookWorker, self).__init__(accountBook.getName(), template)
+        self.accountBook = accountBook
+        self.occurrenceCache = occurrenceCache
+    # end __init__(AccountBook, Optional[OccurrenceCache], ReminderAccessor)
+
+    def call(self):
+        # type: () -> OpenBookWorker
+        self.computeBook(self.accountBook, self.occurrenceCache)
+
+        return self
+    # end call()
+
+# end class OpenBookWorker
+
+
+class MultiBookSpending(object):
+    """Class to combine the planned spending of several account books, each
+    computed on its own thread, keeping each book's total per group"""
+
+    def __init__(self):
+        # type: () -> None
+        self.bookNames = []  # type: List[str]
+        # group description to its total in each book so far, in bookNames order
+        self.bookTotals = {}  # type: Dict[str, List[Decimal]]
+    # end __init__()
+
+    def addBook(self, bookName, groups):
+        # type: (str, List[ReminderGroup]) -> None
+        """Add one book's groups as the next breakdown column."""
+        self.bookNames.append(bookName)
+
+        for totals in self.bookTotals.values():
+            totals.append(Decimal(0))
+        # end for
+
+        for reminderGroup in groups:
+            totals = self.bookTotals.setdefault(
+                reminderGroup.descCore, [Decimal(0)] * len(self.bookNames))
+            totals[-1] += reminderGroup.annualTotal
+        # end for
+    # end addBook(str, List[ReminderGroup])
+
+    def addBooks(self, template, occurrenceCache, folders):
+        # type: (ReminderAccessor, Optional[OccurrenceCache], List[str]) -> None
+        """Add the planned spending of a template accessor's own book, using
+        its occurrence cache, then of the books in these folders, all with the
+        template's horizon and filters; all the books are computed at once so
+        the elapsed time is about that of the slowest book."""
+        workers = [OpenBookWorker(template.accountBook, occurrenceCache, template)] \
+            + [BookWorker(folder, template) for folder in folders]
+        executor = Executors.newFixedThreadPool(len(workers))
+        startTime = time()
+
+        try:
+            for future in executor.invokeAll(workers):
+                future.get()  # rethrows any worker failure
+            # end for
+        finally:
+            executor.shutdown()
+
+        for worker in workers:
+            self.addBook(worker.bookName, worker.groups)
+        # end for
+        logging.info("Computed %d books' planned spending in %.3f s.",
+                     len(workers), time() - startTime)
+    # end addBooks(ReminderAccessor, Optional[OccurrenceCache], List[str])
+
+    def getRows(self, byDescription=False):
+        # type: (bool) -> List[Tuple[str, Decimal, List[Decimal]]]
+        """Get the description, combined total and per-book totals of each
+        group, biggest combined total first or by description."""
+        rows = [(desc, sum(totals, Decimal(0)), totals)
+                for desc, totals in self.bookTotals.items()]
+
+        if byDescription:
+            rows.sort(key=lambda row: row[0])
+        else:
+            rows.sort(key=lambda row: row[1], reverse=True)
+
+        return rows
+    # end getRows(bool)
+
+# end class MultiBookSpending
@@ -0,0 +1,100 @@
+# Keep reminder occurrence dates on disk so unchanged reminders are not recomputed
+import json
+import logging
+import os
+from datetime import date
+
+from com.infinitekind.moneydance.model import AccountBook
+from typing import Dict, List, Optional
+
+from CacheDir import CacheDir
+from ReminderSchedule import ReminderSchedule
+
+
+class OccurrenceCache(object):
+    """Class to hold reminder occurrence dates between runs"""
+
+    MAX_ENTRIES = 2000
+
+    def __init__(self, path, maxEntries=MAX_ENTRIES):
+        # type: (str, int) -> None
+        self.path = path
+        self.maxEntries = maxEntries
+        self.entries = {}  # type: Dict[str, Dict]
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    # end __init__(str, int)
+
+    @staticmethod
+    def forBook(accountBook):
+        # type: (AccountBook) -> OccurrenceCache
+        return OccurrenceCache(CacheDir.bookPath("occurrences", accountBook, "json"))
+    # end forBook(AccountBook)
+
+    def load(self):
+        # type: () -> None
+        """Read our entries from disk; a missing or unreadable file leaves us empty."""
+        try:
+            with open(self.path, "r") as cacheFile:
+                contents = json.load(cacheFile)
+            self.entries = contents["entries"]
+            self.generation = contents["generation"] + 1
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self.path):
+                logging.warning("Ignoring occurrence cache %s: %s", self.path, e)
+    # end load()
+
+    def save(self):
+        # type: () -> None
+        """Write our entries to disk, first dropping the least recently used
+        ones when there are too many."""
+        if len(self.entries) > self.maxEntries:
+            byAge = sorted(self.entries, key=lambda uuid: self.entries[uuid]["used"])
+
+            for uuid in byAge[:len(self.entries) - self.maxEntries]:
+                del self.entries[uuid]
+                self.evictions += 1
+            # end for
+        CacheDir.makeParent(self.path)
+
+        with open(self.path, "w") as cacheFile:
+            json.dump({"generation": self.generation, "entries": self.entries}, cacheFile)
+        logging.info("Occurrence cache: %d hits, %d misses, %d evictions, %d entries.",
+                     self.hits, self.misses, self.evictions, len(self.entries))
+    # end save()
+
+    def get(self, uuid, timestamp, startDate, endDate):
+        # type: (str, int, date, date) -> Optional[List[date]]
+        """Get cached occurrence dates, evicting an entry that is out of date."""
+        entry = self.entries.get(uuid)
+
+        if entry is not None:
+            if entry["timestamp"] == timestamp \
+                    and entry["start"] == ReminderSchedule.dateToInt(startDate) \
+                    and entry["end"] == ReminderSchedule.dateToInt(endDate):
+                entry["used"] = self.generation
+                self.hits += 1
+
+                return [ReminderSchedule.intToDate(dateInt) for dateInt in entry["dates"]]
+
+            del self.entries[uuid]
+            self.evictions += 1
+        self.misses += 1
+
+        return None
+    # end get(str, int, date, date)
+
+    def put(self, uuid, timestamp, startDate, endDate, occurrences):
+        # type: (str, int, date, date, List[date]) -> None
+        self.entries[uuid] = {
+            "timestamp": timestamp,
+            "start": ReminderSchedule.dateToInt(startDate),
+            "end": ReminderSchedule.dateToInt(endDate),
+            "dates": [ReminderSchedule.dateToInt(dt) for dt in occurrences],
+            "used": self.generation
+        }
+    # end put(str, int, date, date, List[date])
+
+# end class OccurrenceCache
@@ -1,50 +1,92 @@
 # Look at all spending reminders to see what's planned
+import heapq
+import logging
 from datetime import date, timedelta
 from decimal import Decimal
+from time import time
 
-from com.infinitekind.moneydance.model import AbstractTxn, Account, AccountBook, ParentTxn, Reminder, ReminderSet
-from typing import Dict, List
+from com.infinitekind.moneydance.model import AbstractTxn, Account, AccountBook, CurrencyTable, CurrencyType
+from com.infinitekind.moneydance.model import ParentTxn, Reminder, ReminderListener, ReminderSet
+from com.infinitekind.moneydance.model import SplitTxn, TransactionSet
+from java.lang import Runtime
+from java.util.concurrent import Callable, Executors
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from BudgetComparison import BudgetComparison
+from CashFlowForecast import CashFlowForecast
 from Configure import Configure
-
-
-class ReminderGroup(object):
-    """Class to hold a group of planned reminders that have the same core description"""
-
-    ONE_DAY = timedelta(days=1)
-
-    def __init__(self, description):
-        # type: (str) -> None
-        self.descCore = description  # type: str
-        self.annualTotal = Decimal(0)
-    # end __init__(str)
-
-    def addReminder(self, reminder, spendAmt):
-        # type: (Reminder, Decimal) -> None
-        annualTotal = Decimal(0)
-        curDate = date.today()
-        endDate = date(curDate.year + 1, curDate.month, curDate.day)
-
-        while curDate < endDate:
-            if reminder.occursOnDate(curDate):
-                annualTotal += spendAmt
-
-            curDate += self.ONE_DAY
-        # end while
-        self.annualTotal += annualTotal
-    # end addReminder(Reminder, Decimal)
-
-# end class ReminderGroup
+from DateAdapter import DateAdapter
+from MultiBookSpending import MultiBookSpending
+from OccurrenceCache import OccurrenceCache
+from ReminderGroup import AccountInfo, ReminderGroup
+from ReminderSchedule import ReminderSchedule
+from ReportSinks import ReportSink
+from ResultCache import ResultCache
+from SpendingTimeline import SpendingTimeline
+from WhatIfSimulator import WhatIfScenario, WhatIfSimulator
 
 
 class ReminderAccessor(object):
     """Class to retrieve and aggregate planned reminders"""
 
-    def __init__(self, accountBook):
-        # type: (AccountBook) -> None
+    # forecast bucket sizes
+    WEEKLY = "week"
+    MONTHLY = "month"
+    QUARTERLY = "quarter"
+
+    # reminder evaluation modes
+    REMINDER_MAJOR = "reminder-major"
+    DAY_MAJOR = "day-major"
+    AUTO = "auto"
+    # in auto mode, at least this many reminders to scan are evaluated day-major; a
+    # day walk asks Moneydance about every reminder on every day, so it only pays
+    # off once it replaces a schedule for most of a large book's reminders;
+    # benchmarkEvaluationModes measures this crossover for a particular book
+    DAY_MAJOR_MIN_REMINDERS = 1500
+
+    def __init__(self, accountBook, occurrenceCache=None, startDate=None, endDate=None):
+        # type: (AccountBook, Optional[OccurrenceCache], Optional[date], Optional[date]) -> None
         self.accountBook = accountBook
+        self.occurrenceCache = occurrenceCache
         self.reminderGroups = {}  # type: Dict[str, ReminderGroup]
-    # end __init__(AccountBook)
+        self.startDate = startDate or date.today()
+        self.endDate = endDate or ReminderSchedule.addMonths(self.startDate, 12)
+        self.occurrenceMemo = {}  # type: Dict[Tuple[str, date, date], List[date]]
+        self.memoCosts = {}  # type: Dict[Tuple[str, date, date], int]
+        # occurrence counts of reminders whose dates were never needed
+        self.occurrenceCounts = {}  # type: Dict[Tuple[str, date, date], int]
+        self.probesSaved = 0
+        self.evaluationMode = ReminderAccessor.AUTO
+        self.dayMajorMinReminders = ReminderAccessor.DAY_MAJOR_MIN_REMINDERS
+        self.accountInfos = {}  # type: Dict[Account, AccountInfo]
+        self.accountInfoHits = 0
+        self.accountInfoMisses = 0
+        self.parallel = False
+        self.contributions = {}  # type: Dict[str, List[Tuple[str, int, AccountInfo, List[date]]]]
+        self.listener = None  # type: Optional[PlannedSpendingListener]
+        # full account names whose subtrees to include (all when empty) or exclude
+        self.includeAccounts = []  # type: List[str]
+        self.excludeAccounts = []  # type: List[str]
+        # text to find in reminder descriptions to include (all when empty) or exclude
+        self.includeDescriptions = []  # type: List[str]
+        self.excludeDescriptions = []  # type: List[str]
+        self.numPruned = 0
+        self.daysScanned = 0
+        self.rateTable = None  # type: Optional[Dict[CurrencyType, Decimal]]
+        self.baseScale = None  # type: Optional[Decimal]
+    # end __init__(AccountBook, Optional[OccurrenceCache], Optional[date], Optional[date])
+
+    def copyFor(self, accountBook, occurrenceCache=None):
+        # type: (AccountBook, Optional[OccurrenceCache]) -> ReminderAccessor
+        """Get a new accessor for an account book with our horizon and filters."""
+        accessor = ReminderAccessor(accountBook, occurrenceCache, self.startDate, self.endDate)
+        accessor.includeAccounts = self.includeAccounts
+        accessor.excludeAccounts = self.excludeAccounts
+        accessor.includeDescriptions = self.includeDescriptions
+        accessor.excludeDescriptions = self.excludeDescriptions
+
+        return accessor
+    # end copyFor(AccountBook, Optional[OccurrenceCache])
 
     def getReminderGroupForDesc(self, description):
         # type: (str) -> ReminderGroup
@@ -55,45 +97,720 @@ class ReminderAccessor(object):
         return self.reminderGroups[description]
     # end getReminderGroupForDesc(str)
 
-    def getPlannedSpending(self):
-        # type: () -> List[ReminderGroup]
+    def getOccurrences(self, remind):
+        # type: (Reminder) -> List[date]
+        """Get the dates our reminder occurs on within our horizon, computing
+        them only the first time each reminder is asked about."""
+        uuid = remind.getUUID()  # type: str
+        key = (uuid, self.startDate, self.endDate)
+
+        if key in self.occurrenceMemo:
+            self.probesSaved += self.memoCosts[key]
+        else:
+            timestamp = remind.getSyncTimestamp()  # type: int
+            occurrences = None  # type: Optional[List[date]]
+            self.memoCosts[key] = 0
+
+            if self.occurrenceCache:
+                occurrences = self.occurrenceCache.get(
+                    uuid, timestamp, self.startDate, self.endDate)
+
+            if occurrences is None:
+                schedule = ReminderSchedule(remind)
+                occurrences = schedule.occurrenceDates(self.startDate, self.endDate)
+                self.memoCosts[key] = schedule.bridgeCalls
+                lo, hi = schedule.getWindow(self.startDate, self.endDate)
+                self.daysScanned += max((hi - lo).days, 0)
+
+                if self.occurrenceCache:
+                    self.occurrenceCache.put(
+                        uuid, timestamp, self.startDate, self.endDate, occurrences)
+            self.occurrenceMemo[key] = occurrences
+
+        return self.occurrenceMemo[key]
+    # end getOccurrences(Reminder)
+
+    def countOccurrences(self, remind):
+        # type: (Reminder) -> int
+        """Count the times our reminder occurs within our horizon, from its
+        memoized or cached dates when there are any and otherwise from its
+        rules, without listing its dates."""
+        uuid = remind.getUUID()  # type: str
+        key = (uuid, self.startDate, self.endDate)
+
+        if key in self.occurrenceMemo:
+            self.probesSaved += self.memoCosts[key]
+
+            return len(self.occurrenceMemo[key])
+
+        if key not in self.occurrenceCounts:
+            occurrences = None  # type: Optional[List[date]]
+
+            if self.occurrenceCache:
+                occurrences = self.occurrenceCache.get(
+                    uuid, remind.getSyncTimestamp(), self.startDate, self.endDate)
+
+            if occurrences is not None:
+                self.occurrenceMemo[key] = occurrences
+                self.memoCosts[key] = 0
+
+                return len(occurrences)
+            schedule = ReminderSchedule(remind)
+            self.occurrenceCounts[key] = schedule.countOccurrences(self.startDate, self.endDate)
+            lo, hi = schedule.getWindow(self.startDate, self.endDate)
+            self.daysScanned += max((hi - lo).days, 0)
+
+        return self.occurrenceCounts[key]
+    # end countOccurrences(Reminder)
+
+    def useDayMajor(self, numReminders):
+        # type: (int) -> bool
+        if self.evaluationMode == ReminderAccessor.AUTO:
+            return numReminders >= self.dayMajorMinReminders
+
+        return self.evaluationMode == ReminderAccessor.DAY_MAJOR
+    # end useDayMajor(int)
+
+    def memoizeFromCache(self, reminders):
+        # type: (List[Reminder]) -> List[Reminder]
+        """Memoize the occurrences our occurrence cache has for these
+        reminders; get the reminders it does not have."""
+        if not self.occurrenceCache:
+            return list(reminders)
+        misses = []
+
+        for remind in reminders:
+            key = (remind.getUUID(), self.startDate, self.endDate)
+            occurrences = self.occurrenceCache.get(
+                key[0], remind.getSyncTimestamp(), self.startDate, self.endDate)
+
+            if occurrences is None:
+                misses.append(remind)
+            else:
+                self.occurrenceMemo[key] = occurrences
+                self.memoCosts[key] = 0
+        # end for
+
+        return misses
+    # end memoizeFromCache(List[Reminder])
+
+    def walkDays(self, reminders):
+        # type: (List[Reminder]) -> Dict[str, List[date]]
+        """Walk the part of our horizon these reminders live in once, asking
+        Moneydance which reminders occur on each day; get the occurrences of
+        each of these reminders by UUID."""
+        occurrences = dict((remind.getUUID(), []) for remind in reminders)
         reminderSet = self.accountBook.getReminders()  # type: ReminderSet
-        reminders = reminderSet.getAllReminders()  # type: List[Reminder]
+        windows = [ReminderSchedule.lifeWindow(remind.getInitialDateInt(), remind.getLastDateInt(),
+                                               self.startDate, self.endDate)
+                   for remind in reminders]
+        curDate = min([lo for lo, _ in windows] or [self.endDate])
+        walkEnd = max([hi for _, hi in windows] or [self.startDate])
+
+        for cal in DateAdapter.iterCalendars(curDate, walkEnd):
+            for remind in reminderSet.getRemindersOnDay(cal):
+                uuid = remind.getUUID()  # type: str
+
+                if uuid in occurrences:
+                    occurrences[uuid].append(curDate)
+            # end for
+            curDate += ReminderSchedule.ONE_DAY
+        # end for
+
+        return occurrences
+    # end walkDays(List[Reminder])
+
+    def memoizeByDay(self, reminders):
+        # type: (List[Reminder]) -> None
+        """Memoize the occurrences of all these reminders, taking what our
+        occurrence cache has and walking the days only for the rest, whose
+        occurrences then go into the cache."""
+        misses = self.memoizeFromCache(reminders)
+
+        if not misses:
+            return
+        occurrences = self.walkDays(misses)
+
+        for remind in misses:
+            lo, hi = ReminderSchedule.lifeWindow(remind.getInitialDateInt(), remind.getLastDateInt(),
+                                                 self.startDate, self.endDate)
+            self.daysScanned += max((hi - lo).days, 0)
+        # end for
+
+        for uuid, dates in occurrences.items():
+            key = (uuid, self.startDate, self.endDate)
+            self.occurrenceMemo[key] = dates
+            self.memoCosts[key] = 0
+        # end for
+        self.cacheOccurrences(misses)
+    # end memoizeByDay(List[Reminder])
+
+    def cacheOccurrences(self, reminders):
+        # type: (List[Reminder]) -> None
+        """Put the memoized occurrences of these reminders into our occurrence cache."""
+        if not self.occurrenceCache:
+            return
+
+        for remind in reminders:
+            uuid = remind.getUUID()  # type: str
+            self.occurrenceCache.put(uuid, remind.getSyncTimestamp(), self.startDate, self.endDate,
+                                     self.occurrenceMemo[(uuid, self.startDate, self.endDate)])
+        # end for
+    # end cacheOccurrences(List[Reminder])
 
+    def benchmarkEvaluationModes(self, sizes=(50, 100, 200, 400, 800, 1600, 3200)):
+        # type: (Tuple[int, ...]) -> int
+        """Time both evaluation modes on growing numbers of this book's
+        reminders, then evaluate day-major in auto mode from the number of
+        reminders where walking the days is the faster mode."""
+        reminders = list(self.accountBook.getReminders().getAllReminders())
+        crossover = None  # type: Optional[int]
+        dayMajorTime = reminderMajorTime = 0.0
+        numTimed = 0
+
+        for size in sizes:
+            subset = reminders[:size]
+            startTime = time()
+            self.walkDays(subset)
+            dayMajorTime = time() - startTime
+            startTime = time()
+
+            for remind in subset:
+                ReminderSchedule(remind).occurrenceDates(self.startDate, self.endDate)
+            # end for
+            reminderMajorTime = time() - startTime
+            numTimed = len(subset)
+            logging.info("%d reminders: day-major %.3f s, reminder-major %.3f s",
+                         numTimed, dayMajorTime, reminderMajorTime)
+
+            if crossover is None and dayMajorTime <= reminderMajorTime:
+                crossover = numTimed
+
+            if numTimed < size:
+                break
+        # end for
+
+        if crossover is None:
+            # extrapolate past the largest size timed; a day walk costs about
+            # the same however many of its reminders are needed
+            perReminder = reminderMajorTime / max(numTimed, 1)
+            crossover = int(dayMajorTime / perReminder) + 1 if perReminder else numTimed + 1
+        logging.info("Day-major evaluation pays off from about %d reminders.", crossover)
+        self.dayMajorMinReminders = crossover
+
+        return crossover
+    # end benchmarkEvaluationModes(Tuple[int, ...])
+
+    def getSpendingSplits(self, reminders=None):
+        # type: (Optional[List[Reminder]]) -> Iterator[Tuple[Reminder, str, int, AccountInfo]]
+        """Generate the reminder, group description, amount in minor units and
+        account details of each reminder split that spends to an expense account."""
+        if reminders is None:
+            reminderSet = self.accountBook.getReminders()  # type: ReminderSet
+            reminders = reminderSet.getAllReminders()
+        reminders, toScan = self.pruneReminders(reminders)
+
+        if toScan and self.useDayMajor(len(toScan)):
+            self.memoizeByDay(toScan)
+
+        for split in self.iterSplits(reminders):
+            yield split
+        # end for
+    # end getSpendingSplits(Optional[List[Reminder]])
+
+    def iterSplits(self, reminders):
+        # type: (List[Reminder]) -> Iterator[Tuple[Reminder, str, int, AccountInfo]]
+        """Generate the spending splits of reminders already pruned."""
         for remind in reminders:
             txn = remind.getTransaction()  # type: ParentTxn
             numSplits = txn.getOtherTxnCount()  # type: int
 
             for i in range(numSplits):
                 other = txn.getOtherTxn(i)  # type: AbstractTxn
-                spendAmt = self.getSpendValue(other)  # type: Decimal
+                # canSpend already looked these accounts up while pruning
+                otherInfo = self.getAccountInfo(other.getAccount(), False)
+                spendUnits = self.getSpendValue(other, otherInfo)  # type: int
 
-                if spendAmt > 0:
+                if spendUnits > 0 and self.includesAccount(otherInfo):
                     desc = [self.getDescriptionCore(remind)]  # type: List[str]
 
                     if numSplits > 1:
                         desc.append(": ")
                         desc.append(other.getDescription())
 
-                    self.getReminderGroupForDesc("".join(desc)).addReminder(remind, spendAmt)
+                    yield remind, "".join(desc), spendUnits, otherInfo
             # end for splits
         # end for reminders
+    # end iterSplits(List[Reminder])
 
-        return list(self.reminderGroups.values())
+    def pruneReminders(self, reminders):
+        # type: (List[Reminder]) -> Tuple[List[Reminder], List[Reminder]]
+        """Cheaply drop reminders that cannot spend to an included expense
+        account, and memoize no occurrences for those that do not live in our
+        horizon; get the reminders kept and those still needing a scan."""
+        kept = []
+        toScan = []
+
+        for remind in reminders:
+            if not self.canSpend(remind):
+                self.numPruned += 1
+                continue
+            kept.append(remind)
+            key = (remind.getUUID(), self.startDate, self.endDate)
+
+            if key in self.occurrenceMemo:
+                continue
+            lo, hi = ReminderSchedule.lifeWindow(remind.getInitialDateInt(), remind.getLastDateInt(),
+                                                 self.startDate, self.endDate)
+
+            if lo < hi:
+                toScan.append(remind)
+            else:
+                self.occurrenceMemo[key] = []
+                self.memoCosts[key] = 2  # the initial and last date getters
+                self.numPruned += 1
+        # end for
+
+        return kept, toScan
+    # end pruneReminders(List[Reminder])
+
+    def canSpend(self, remind):
+        # type: (Reminder) -> bool
+        """Determine if a reminder is a transaction with a split to an included
+        expense account and a description passing our filters."""
+        if remind.getReminderType() != Reminder.Type.TRANSACTION:
+            return False
+        txn = remind.getTransaction()  # type: ParentTxn
+
+        if txn is None:
+            return False
+
+        if self.includeDescriptions or self.excludeDescriptions:
+            description = remind.getDescription().lower()
+
+            if self.includeDescriptions and not any(
+                    text.lower() in description for text in self.includeDescriptions):
+                return False
+
+            if any(text.lower() in description for text in self.excludeDescriptions):
+                return False
+
+        for i in range(txn.getOtherTxnCount()):
+            otherInfo = self.getAccountInfo(txn.getOtherTxn(i).getAccount())
+
+            if otherInfo.accountType == Account.AccountType.EXPENSE \
+                    and self.includesAccount(otherInfo):
+                return True
+        # end for
+
+        return False
+    # end canSpend(Reminder)
+
+    def includesAccount(self, accountInfo):
+        # type: (AccountInfo) -> bool
+        """Determine if an account is in the subtrees our filters include."""
+        if not (self.includeAccounts or self.excludeAccounts):
+            return True
+        fullName = self.getFullName(accountInfo)
+
+        def inSubtree(rootName):
+            return fullName == rootName or fullName.startswith(rootName + ":")
+
+        if self.includeAccounts and not any(inSubtree(name) for name in self.includeAccounts):
+            return False
+
+        return not any(inSubtree(name) for name in self.excludeAccounts)
+    # end includesAccount(AccountInfo)
+
+    def getPlannedSpending(self):
+        # type: () -> List[ReminderGroup]
+        return list(self.iterPlannedSpending())
     # end getPlannedSpending()
 
+    def getTopPlannedSpending(self, count):
+        # type: (int) -> List[ReminderGroup]
+        """Get the groups with the biggest totals, biggest first, keeping only
+        that many groups in a heap rather than sorting them all."""
+        return heapq.nlargest(count, self.iterPlannedSpending(),
+                              key=lambda spend: spend.annualTotal)
+    # end getTopPlannedSpending(int)
+
+    def iterPlannedSpending(self):
+        # type: () -> Iterator[ReminderGroup]
+        """Generate new groups for all reminders on each call, reusing only
+        our memoized occurrences and account details."""
+        # count only this call's work
+        self.probesSaved = self.accountInfoHits = self.accountInfoMisses = 0
+        self.numPruned = self.daysScanned = 0
+
+        if self.parallel:
+            reminderGroups = self.accumulateInParallel()
+        else:
+            reminderGroups = self.accumulate(self.getSpendingSplits())
+        logging.info("Memoized %d reminder schedules; reusing them saved %d probes.",
+                     len(self.occurrenceMemo), self.probesSaved)
+        logging.info("Account info cache: %d hits, %d misses.",
+                     self.accountInfoHits, self.accountInfoMisses)
+        logging.info("Pruned %d reminders before scanning; scanned %d reminder days.",
+                     self.numPruned, self.daysScanned)
+
+        for reminderGroup in reminderGroups.values():
+            yield reminderGroup
+        # end for
+    # end iterPlannedSpending()
+
+    def accumulate(self, splits):
+        # type: (Iterator[Tuple[Reminder, str, int, AccountInfo]]) -> Dict[str, ReminderGroup]
+        """Total the planned spending of these splits in new groups by description."""
+        reminderGroups = {}  # type: Dict[str, ReminderGroup]
+
+        for remind, desc, spendUnits, otherInfo in splits:
+            if desc not in reminderGroups:
+                reminderGroups[desc] = ReminderGroup(desc)
+
+            reminderGroups[desc].addReminder(spendUnits, otherInfo, self.getOccurrences(remind))
+        # end for
+
+        return reminderGroups
+    # end accumulate(Iterator[Tuple[Reminder, str, int, AccountInfo]])
+
+    # Thread-safety audit for accumulateInParallel. Workers only schedule reminders:
+    # - Reminder getters (getUUID, getSyncTimestamp, the getRepeat* rule getters and
+    #   initial/last dates) return fields or copies; safe while nobody edits
+    #   reminders during the run.
+    # - Reminder.occursOnDate/getNextOccurance compute from the reminder's own fields
+    #   and the Calendar passed in; DateAdapter keeps a separate Calendar per thread.
+    # Not safe and so kept off the workers: ReminderSet.getRemindersOnDay (day-major
+    # mode walks the shared set), the OccurrenceCache (unsynchronized dicts, counters
+    # and file writes) and our own groups, memo and counters. This thread reads the
+    # cache before and writes it after the workers, and merges their memos.
+    def accumulateInParallel(self):
+        # type: () -> Dict[str, ReminderGroup]
+        """Schedule the reminders our occurrence cache misses across a thread
+        pool with a worker accessor per slice, then total all reminders in
+        new groups here from the merged memo, so totals and output order
+        match the serial mode."""
+        reminders = list(self.accountBook.getReminders().getAllReminders())
+        reminders, toScan = self.pruneReminders(reminders)
+        misses = self.memoizeFromCache(toScan)
+        numThreads = Runtime.getRuntime().availableProcessors()
+        sliceSize = -(-len(misses) // numThreads) or 1
+        workers = []
+
+        for start in range(0, len(misses), sliceSize):
+            worker = ReminderAccessor(self.accountBook, None, self.startDate, self.endDate)
+            workers.append(ReminderWorker(worker, misses[start:start + sliceSize]))
+        # end for
+
+        if workers:
+            executor = Executors.newFixedThreadPool(numThreads)
+
+            try:
+                for future in executor.invokeAll(workers):
+                    future.get()  # rethrows any worker failure
+                # end for
+            finally:
+                executor.shutdown()
+
+        for worker in workers:
+            self.mergeAccessor(worker.accessor)
+        # end for
+        self.cacheOccurrences(misses)
+        logging.info("Scheduled %d of %d reminders on %d threads.",
+                     len(misses), len(reminders), numThreads)
+
+        return self.accumulate(self.iterSplits(reminders))
+    # end accumulateInParallel()
+
+    def mergeAccessor(self, other):
+        # type: (ReminderAccessor) -> None
+        """Merge a worker accessor's memo and scan count into ours; workers
+        only memoize occurrences, so there is nothing else to merge."""
+        self.occurrenceMemo.update(other.occurrenceMemo)
+        self.memoCosts.update(other.memoCosts)
+        self.daysScanned += other.daysScanned
+    # end mergeAccessor(ReminderAccessor)
+
+    def getCategoryRollup(self):
+        # type: () -> List[ReminderGroup]
+        """Get planned spending per expense category, each category's total
+        including the spending in all its subcategories."""
+        categoryGroups = {}  # type: Dict[str, ReminderGroup]
+
+        for remind, _, spendUnits, otherInfo in self.getSpendingSplits():
+            occurrences = self.getOccurrences(remind)
+
+            for fullName in self.getCategoryPath(otherInfo):
+                if fullName not in categoryGroups:
+                    categoryGroups[fullName] = ReminderGroup(fullName)
+
+                categoryGroups[fullName].addReminder(spendUnits, otherInfo, occurrences)
+            # end for
+        # end for
+
+        return list(categoryGroups.values())
+    # end getCategoryRollup()
+
+    def getPlannedByAccount(self):
+        # type: () -> Dict[Account, Decimal]
+        """Get planned spending per expense account, without rolling up."""
+        minorTotals = {}  # type: Dict[Account, int]
+
+        for remind, _, spendUnits, otherInfo in self.getSpendingSplits():
+            numOccurrences = self.countOccurrences(remind)
+
+            if numOccurrences:
+                account = otherInfo.account
+                minorTotals[account] = minorTotals.get(account, 0) + spendUnits * numOccurrences
+        # end for
+
+        return dict((account, Decimal(total) * self.getAccountInfo(account).scale)
+                    for account, total in minorTotals.items())
+    # end getPlannedByAccount()
+
+    def getActualSpending(self, startDate, endDate):
+        # type: (date, date) -> List[ReminderGroup]
+        """Get actual spending in [startDate, endDate) per included expense
+        category, rolled up like getCategoryRollup, from one pass over all
+        transactions."""
+        startDateInt = ReminderSchedule.dateToInt(startDate)
+        endDateInt = ReminderSchedule.dateToInt(endDate)
+        txnSet = self.accountBook.getTransactionSet()  # type: TransactionSet
+        accountTotals = {}  # type: Dict[Account, int]
+        numTxns = 0
+        startTime = time()
+
+        for txn in txnSet.iterableTxns():
+            numTxns += 1
+
+            if isinstance(txn, SplitTxn) and startDateInt <= txn.getDateInt() < endDateInt:
+                account = txn.getAccount()  # type: Account
+                accountInfo = self.getAccountInfo(account)
+
+                # the same account filters as the planned side
+                if accountInfo.accountType == Account.AccountType.EXPENSE \
+                        and self.includesAccount(accountInfo):
+                    accountTotals[account] = accountTotals.get(account, 0) + txn.getValue()
+        # end for
+        categoryGroups = {}  # type: Dict[str, ReminderGroup]
+
+        for account, total in accountTotals.items():
+            accountInfo = self.getAccountInfo(account)
+
+            for fullName in self.getCategoryPath(accountInfo):
+                if fullName not in categoryGroups:
+                    categoryGroups[fullName] = ReminderGroup(fullName)
+
+                categoryGroups[fullName].addUnits(total, accountInfo)
+            # end for
+        # end for
+        logging.info("Scanned %d transactions for actual spending in %.3f s.",
+                     numTxns, time() - startTime)
+
+        return list(categoryGroups.values())
+    # end getActualSpending(date, date)
+
+    def getFullName(self, accountInfo):
+        # type: (AccountInfo) -> str
+        """Get the full name of an account, asking for it only once per account."""
+        if accountInfo.fullName is None:
+            accountInfo.fullName = accountInfo.account.getFullAccountName()
+
+        return accountInfo.fullName
+    # end getFullName(AccountInfo)
+
+    def getCategoryPath(self, accountInfo):
+        # type: (AccountInfo) -> List[str]
+        """Get the full names of an expense category and its parent categories,
+        working them out only once per account."""
+        if accountInfo.categoryPath is None:
+            account = accountInfo.account
+            categoryPath = [self.getFullName(accountInfo)]
+            parent = account.getParentAccount()  # type: Account
+
+            if parent is not None:
+                parentInfo = self.getAccountInfo(parent)
+
+                if parentInfo.accountType == Account.AccountType.EXPENSE:
+                    categoryPath.extend(self.getCategoryPath(parentInfo))
+            accountInfo.categoryPath = categoryPath
+
+        return accountInfo.categoryPath
+    # end getCategoryPath(AccountInfo)
+
+    def startResident(self):
+        # type: () -> None
+        """Compute our totals once, then keep them current by listening for
+        reminders being added, modified and removed."""
+        reminderSet = self.accountBook.getReminders()  # type: ReminderSet
+        reminders = reminderSet.getAllReminders()  # type: List[Reminder]
+
+        if self.useDayMajor(len(reminders)):
+            self.memoizeByDay(reminders)
+        # a single changed reminder is always cheapest to evaluate by its schedule
+        self.evaluationMode = ReminderAccessor.REMINDER_MAJOR
+
+        for remind in reminders:
+            self.addContribution(remind)
+        # end for
+        self.listener = PlannedSpendingListener(self)
+        reminderSet.addReminderListener(self.listener)
+    # end startResident()
+
+    def stopResident(self):
+        # type: () -> None
+        """Stop listening for reminder changes; our totals stay as they are."""
+        if self.listener:
+            self.accountBook.getReminders().removeReminderListener(self.listener)
+            self.listener = None
+    # end stopResident()
+
+    def getCurrentSpending(self):
+        # type: () -> List[ReminderGroup]
+        """Get our groups as they stand, without recomputing anything."""
+        return list(self.reminderGroups.values())
+    # end getCurrentSpending()
+
+    def addContribution(self, remind):
+        # type: (Reminder) -> None
+        """Add a reminder's splits to our groups, remembering what each added."""
+        contributions = []
+
+        for _, desc, spendUnits, otherInfo in self.getSpendingSplits([remind]):
+            occurrences = self.getOccurrences(remind)
+            self.getReminderGroupForDesc(desc).addReminder(spendUnits, otherInfo, occurrences)
+            contributions.append((desc, spendUnits, otherInfo, occurrences))
+        # end for
+        self.contributions[remind.getUUID()] = contributions
+    # end addContribution(Reminder)
+
+    def removeContribution(self, remind):
+        # type: (Reminder) -> None
+        """Subtract what a reminder added earlier and forget its occurrences."""
+        uuid = remind.getUUID()  # type: str
+
+        for desc, spendUnits, otherInfo, occurrences in self.contributions.pop(uuid, ()):
+            reminderGroup = self.reminderGroups[desc]
+            reminderGroup.removeReminder(spendUnits, otherInfo, occurrences)
+
+            if not reminderGroup.numSplits:
+                del self.reminderGroups[desc]
+        # end for
+        key = (uuid, self.startDate, self.endDate)
+        self.occurrenceMemo.pop(key, None)
+        self.memoCosts.pop(key, None)
+        self.occurrenceCounts.pop(key, None)
+    # end removeContribution(Reminder)
+
+    def getSpendingForecast(self, startDate, endDate, bucketSize=MONTHLY):
+        # type: (date, date, str) -> Tuple[List[date], List[ReminderGroup]]
+        """Make [startDate, endDate) our horizon and get the start date of each
+        bucket in it along with groups whose bucketTotals hold the planned
+        spending in each bucket."""
+        self.startDate, self.endDate = startDate, endDate
+        bucketStarts = self.getBucketStarts(startDate, endDate, bucketSize)
+        forecastGroups = {}  # type: Dict[str, ReminderGroup]
+
+        for remind, desc, spendUnits, otherInfo in self.getSpendingSplits():
+            if desc not in forecastGroups:
+                forecastGroups[desc] = ReminderGroup(desc, len(bucketStarts))
+
+            forecastGroups[desc].addReminderByBucket(
+                spendUnits, otherInfo, self.getOccurrences(remind), bucketStarts)
+        # end for
+
+        return bucketStarts, list(forecastGroups.values())
+    # end getSpendingForecast(date, date, str)
+
+    def getSpendingTimeline(self):
+        # type: () -> SpendingTimeline
+        """Get cumulative planned spending for each day of our horizon, keeping
+        each currency apart until a query converts it like the report does."""
+        self.getRateTable()
+        timeline = SpendingTimeline(self.startDate, (self.endDate - self.startDate).days,
+                                    -self.baseScale.as_tuple().exponent)
+
+        for remind, desc, spendUnits, otherInfo in self.getSpendingSplits():
+            timeline.addOccurrences(desc, spendUnits, otherInfo.currency.getIDString(),
+                                    otherInfo.decimalPlaces, otherInfo.rate,
+                                    self.getOccurrences(remind))
+        # end for
+        timeline.accumulate()
+
+        return timeline
+    # end getSpendingTimeline()
+
     @staticmethod
-    def getSpendValue(other):
-        # type: (AbstractTxn) -> Decimal
-        otherAcc = other.getAccount()  # type: Account
+    def getBucketStarts(startDate, endDate, bucketSize):
+        # type: (date, date, str) -> List[date]
+        """Get the first day of each bucket in the range [startDate, endDate)."""
+        bucketStarts = []
+        bucketStart = startDate
+
+        while bucketStart < endDate:
+            bucketStarts.append(bucketStart)
+            numBuckets = len(bucketStarts)
+
+            if bucketSize == ReminderAccessor.WEEKLY:
+                bucketStart = startDate + timedelta(weeks=numBuckets)
+            elif bucketSize == ReminderAccessor.MONTHLY:
+                bucketStart = ReminderSchedule.addMonths(startDate, numBuckets)
+            elif bucketSize == ReminderAccessor.QUARTERLY:
+                bucketStart = ReminderSchedule.addMonths(startDate, 3 * numBuckets)
+            else:
+                raise ValueError("Unknown forecast bucket size " + bucketSize)
+        # end while
 
-        if otherAcc.getAccountType() == Account.AccountType.EXPENSE:
-            decimalPlaces = otherAcc.getCurrencyType().getDecimalPlaces()
+        return bucketStarts
+    # end getBucketStarts(date, date, str)
 
-            return Decimal(other.getValue()).scaleb(-decimalPlaces)
+    def getAccountInfo(self, account, countHit=True):
+        # type: (Account, bool) -> AccountInfo
+        """Get the details of an account, reading them only once per run;
+        a repeat lookup of the same split need not count as a hit."""
+        accountInfo = self.accountInfos.get(account)
+
+        if accountInfo is None:
+            self.accountInfoMisses += 1
+            accountInfo = self.accountInfos[account] = AccountInfo(account)
+            accountInfo.rate = self.getRateTable().get(accountInfo.currency, Decimal(1))
+            accountInfo.baseScale = self.baseScale
+        elif countHit:
+            self.accountInfoHits += 1
+
+        return accountInfo
+    # end getAccountInfo(Account, bool)
+
+    def getRateTable(self):
+        # type: () -> Dict[CurrencyType, Decimal]
+        """Get the multiplier from each currency to the book's base currency,
+        resolving every currency's relative rate only once per run."""
+        if self.rateTable is None:
+            currencies = self.accountBook.getCurrencies()  # type: CurrencyTable
+            baseType = currencies.getBaseType()  # type: CurrencyType
+            self.baseScale = Decimal(1).scaleb(-baseType.getDecimalPlaces())
+            self.rateTable = {baseType: Decimal(1)}
+
+            for currency in currencies.getAllCurrencies():
+                relativeRate = currency.getRelativeRate()  # type: float
+
+                if currency != baseType and relativeRate > 0:
+                    # a relative rate is units of this currency per unit of base
+                    self.rateTable[currency] = 1 / Decimal(repr(relativeRate))
+            # end for
+
+        return self.rateTable
+    # end getRateTable()
+
+    @staticmethod
+    def getSpendValue(other, otherInfo):
+        # type: (AbstractTxn, AccountInfo) -> int
+        """Get the minor units a split spends, or 0 when not to an expense account."""
+        if otherInfo.accountType == Account.AccountType.EXPENSE:
+            return other.getValue()
         else:
-            return Decimal(0)
-    # end getSpendValue(AbstractTxn)
+            return 0
+    # end getSpendValue(AbstractTxn, AccountInfo)
 
     @staticmethod
     def getDescriptionCore(remind):
@@ -112,17 +829,258 @@ class ReminderAccessor(object):
 # end class ReminderAccessor
 
 
+class ReminderWorker(Callable):
+    """Class to memoize the occurrences of a slice of reminders on a thread
+    pool thread"""
+
+    def __init__(self, accessor, reminders):
+        # type: (ReminderAccessor, List[Reminder]) -> None
+        self.accessor = accessor
+        self.reminders = reminders
+    # end __init__(ReminderAccessor, List[Reminder])
+
+    def call(self):
+        # type: () -> ReminderAccessor
+        for remind in self.reminders:
+            self.accessor.getOccurrences(remind)
+        # end for
+
+        return self.accessor
+    # end call()
+
+# end class ReminderWorker
+
+
+class PlannedSpendingListener(ReminderListener):
+    """Class to pass reminder changes on to a resident accessor"""
+
+    def __init__(self, accessor):
+        # type: (ReminderAccessor) -> None
+        self.accessor = accessor
+    # end __init__(ReminderAccessor)
+
+    def reminderAdded(self, reminder):
+        # type: (Reminder) -> None
+        self.accessor.addContribution(reminder)
+    # end reminderAdded(Reminder)
+
+    def reminderModified(self, reminder):
+        # type: (Reminder) -> None
+        self.accessor.removeContribution(reminder)
+        self.accessor.addContribution(reminder)
+    # end reminderModified(Reminder)
+
+    def reminderRemoved(self, reminder):
+        # type: (Reminder) -> None
+        self.accessor.removeContribution(reminder)
+    # end reminderRemoved(Reminder)
+
+# end class PlannedSpendingListener
+
+
 Configure.logToSysErr()
 
+# set to a positive number to cross-check that many random reminders against probing
+VERIFY_SAMPLE_SIZE = 0
+# set to ReminderAccessor.WEEKLY, MONTHLY or QUARTERLY for a forecast by period
+FORECAST_BUCKET = None
+# set to a file path to save a day-by-day timeline for later range queries
+TIMELINE_PATH = None
+# set to True to time reminder-major against day-major evaluation for this book
+BENCHMARK_MODES = False
+# set to True to time occursOnDate probes passing dates against a reused Calendar
+BENCHMARK_PROBES = False
+# set to a positive number to show only that many of the biggest groups
+TOP_COUNT = 0
+# set to a .txt, .csv or .jsonl file path to write the report there instead of the console
+REPORT_PATH = None
+# set to True to evaluate reminders on a thread per available processor
+PARALLEL = False
+# set to True to total by expense category, rolled up to parent categories
+BY_CATEGORY = False
+# set to True to compare planned category spending with the trailing year's actual
+PLANNED_VS_ACTUAL = False
+# set to True to project bank balances from all reminders, including income and transfers
+CASH_FLOW = False
+# full account names whose subtrees to include (all when empty) or leave out
+INCLUDE_ACCOUNTS = []
+EXCLUDE_ACCOUNTS = []
+# text to find in reminder descriptions to include (all when empty) or leave out
+INCLUDE_DESCRIPTIONS = []
+EXCLUDE_DESCRIPTIONS = []
+# group descriptions to leave out, and group descriptions mapped to a factor
+# for their amounts, to compare planned spending under that what-if scenario
+WHAT_IF_REMOVE = []
+WHAT_IF_SCALE = {}
+# folders of other account books to combine with this one's planned spending
+MULTI_BOOK_FOLDERS = []
+# set to True to compare planned spending with each budget, or to a budget's name
+COMPARE_BUDGETS = False
+# fraction of a budgeted amount planned spending may differ by before it is flagged
+BUDGET_TOLERANCE = Decimal("0.05")
+# set to True to recompute the report even when the book has not changed
+FORCE_RECOMPUTE = False
+# set to True to keep totals current as reminders change; afterwards
+# reminderAcc.getCurrentSpending() has the latest groups and
+# reminderAcc.stopResident() stops listening
+RESIDENT = False
+
 if "moneydance" in globals():
     global moneydance
-    reminderAcc = ReminderAccessor(moneydance.getCurrentAccountBook())
-    plannedSpending = reminderAcc.getPlannedSpending()
-    print "{} spending reminders; annual spending for each:".format(
-        len(plannedSpending))
-    plannedSpending.sort(key=lambda spend: spend.annualTotal, reverse=True)
-
-    for reminderGroup in plannedSpending:
-        print "{:>8} {}".format(
-            reminderGroup.annualTotal, reminderGroup.descCore)
+
+    if "reminderAcc" in globals():
+        # stop any resident accessor left listening by an earlier run
+        reminderAcc.stopResident()
+    occurrenceCache = OccurrenceCache.forBook(moneydance.getCurrentAccountBook())
+    occurrenceCache.load()
+    reminderAcc = ReminderAccessor(moneydance.getCurrentAccountBook(), occurrenceCache)
+    reminderAcc.parallel = PARALLEL
+    reminderAcc.includeAccounts = INCLUDE_ACCOUNTS
+    reminderAcc.excludeAccounts = EXCLUDE_ACCOUNTS
+    reminderAcc.includeDescriptions = INCLUDE_DESCRIPTIONS
+    reminderAcc.excludeDescriptions = EXCLUDE_DESCRIPTIONS
+
+    if BENCHMARK_MODES:
+        # auto mode then uses the crossover measured for this book
+        reminderAcc.benchmarkEvaluationModes()
+
+    if BENCHMARK_PROBES:
+        for remind in list(reminderAcc.accountBook.getReminders().getAllReminders())[:1]:
+            DateAdapter.benchmarkProbes(remind, reminderAcc.startDate, reminderAcc.endDate)
+        # end for
+
+    if VERIFY_SAMPLE_SIZE > 0:
+        ReminderSchedule.verifyAgainstProbing(
+            list(reminderAcc.accountBook.getReminders().getAllReminders()),
+            reminderAcc.startDate, reminderAcc.endDate, VERIFY_SAMPLE_SIZE)
+
+    resultCache = ResultCache.forBook(reminderAcc.accountBook)
+    resultKey = ResultCache.makeKey(reminderAcc.accountBook, reminderAcc.startDate, repr(
+        (BY_CATEGORY, TOP_COUNT, INCLUDE_ACCOUNTS, EXCLUDE_ACCOUNTS,
+         INCLUDE_DESCRIPTIONS, EXCLUDE_DESCRIPTIONS)))
+    plannedSpending = None  # type: Optional[List[ReminderGroup]]
+    reportRows = None if FORCE_RECOMPUTE or RESIDENT else resultCache.get(resultKey)
+
+    if reportRows is not None:
+        logging.info("Book unchanged since the last run; reusing its report.")
+    else:
+        if RESIDENT:
+            reminderAcc.startResident()
+            plannedSpending = reminderAcc.getCurrentSpending()
+            plannedSpending.sort(key=lambda spend: spend.annualTotal, reverse=True)
+        elif BY_CATEGORY:
+            plannedSpending = reminderAcc.getCategoryRollup()
+            plannedSpending.sort(key=lambda spend: spend.descCore)
+        elif TOP_COUNT > 0:
+            plannedSpending = reminderAcc.getTopPlannedSpending(TOP_COUNT)
+        else:
+            plannedSpending = reminderAcc.getPlannedSpending()
+            plannedSpending.sort(key=lambda spend: spend.annualTotal, reverse=True)
+        occurrenceCache.save()
+        reportRows = [(reminderGroup.annualTotal, "{} [{}]".format(
+            reminderGroup.descCore, reminderGroup.rateTag) if reminderGroup.rateTag
+            else reminderGroup.descCore) for reminderGroup in plannedSpending]
+
+        if not RESIDENT:
+            resultCache.put(resultKey, reportRows)
+    reportSink = ReportSink.forPath(REPORT_PATH)
+    reportSink.writeTitle("{} spending reminders; annual spending for each:".format(
+        len(reportRows)))
+
+    for annualTotal, description in reportRows:
+        reportSink.writeRow(annualTotal, description)
     # end for
+    reportSink.close()
+
+    if FORECAST_BUCKET:
+        starts, forecast = reminderAcc.getSpendingForecast(
+            reminderAcc.startDate, reminderAcc.endDate, FORECAST_BUCKET)
+        forecast.sort(key=lambda spend: spend.annualTotal, reverse=True)
+        print "Planned spending by {} starting:".format(FORECAST_BUCKET)
+        print " ".join("{:>10}".format(start.isoformat()) for start in starts)
+
+        for reminderGroup in forecast:
+            print " ".join("{:>10}".format(total) for total in reminderGroup.bucketTotals), \
+                reminderGroup.descCore
+        # end for
+
+    if PLANNED_VS_ACTUAL:
+        planned = dict((spend.descCore, spend.annualTotal)
+                       for spend in reminderAcc.getCategoryRollup())
+        actual = dict((spend.descCore, spend.annualTotal) for spend in
+                      reminderAcc.getActualSpending(ReminderSchedule.addMonths(
+                          reminderAcc.startDate, -12), reminderAcc.startDate))
+        print "Planned spending for the next year vs actual spending in the last year:"
+        print "{:>10} {:>10} {}".format("Planned", "Actual", "Category")
+
+        for category in sorted(set(planned) | set(actual)):
+            print "{:>10} {:>10} {}".format(
+                planned.get(category, Decimal(0)), actual.get(category, Decimal(0)), category)
+        # end for
+
+    if TIMELINE_PATH:
+        reminderAcc.getSpendingTimeline().save(TIMELINE_PATH)
+        logging.info("Saved planned spending timeline to %s", TIMELINE_PATH)
+
+    if CASH_FLOW:
+        cashFlow = CashFlowForecast(reminderAcc.accountBook,
+                                    reminderAcc.startDate, reminderAcc.endDate)
+        projections = cashFlow.project()
+        print "Projected balances through {}:".format(reminderAcc.endDate.isoformat())
+        print "{:>12} {:>12} {:>12} {:>10} {}".format(
+            "Start", "End", "Lowest", "On", "Account")
+
+        for projection in projections:
+            print "{:>12} {:>12} {:>12} {:>10} {}".format(
+                Decimal(projection.startBalance).scaleb(-projection.decimalPlaces),
+                Decimal(projection.balance).scaleb(-projection.decimalPlaces),
+                Decimal(projection.lowBalance).scaleb(-projection.decimalPlaces),
+                projection.lowDate.isoformat() if projection.lowDate else "-",
+                projection.account.getFullAccountName())
+        # end for
+        logging.info("Applied %d cash-flow events.", cashFlow.numEvents)
+
+    if WHAT_IF_REMOVE or WHAT_IF_SCALE:
+        scenario = WhatIfScenario()
+
+        for description in WHAT_IF_REMOVE:
+            scenario.remove(description)
+        # end for
+
+        for description, factor in WHAT_IF_SCALE.items():
+            scenario.scaleAmount(description, factor)
+        # end for
+        print "What-if changes to planned spending:"
+        print "{:>10} {:>10} {}".format("Current", "What-if", "Description")
+
+        for description, current, changed in WhatIfSimulator(reminderAcc).compare(scenario):
+            print "{:>10} {:>10} {}".format(current, changed, description)
+        # end for
+
+    if MULTI_BOOK_FOLDERS:
+        multiBook = MultiBookSpending()
+        # every book's column holds its full description groups, whatever this report showed
+        multiBook.addBooks(reminderAcc, occurrenceCache, MULTI_BOOK_FOLDERS)
+        print "Planned spending across {} books:".format(len(multiBook.bookNames))
+        print " ".join(["{:>10}".format("Combined")]
+                       + ["{:>10}".format(name[:10]) for name in multiBook.bookNames]), "Description"
+
+        for description, combined, totals in multiBook.getRows():
+            print " ".join(["{:>10}".format(combined)]
+                           + ["{:>10}".format(total) for total in totals]), description
+        # end for
+
+    if COMPARE_BUDGETS:
+        plannedByAccount = reminderAcc.getPlannedByAccount()
+        budgetName = None if COMPARE_BUDGETS is True else COMPARE_BUDGETS
+
+        for budget in BudgetComparison.getBudgets(reminderAcc.accountBook, budgetName):
+            comparison = BudgetComparison(budget, reminderAcc.startDate, reminderAcc.endDate)
+            print "Planned spending vs budget {}:".format(comparison.name)
+            print "{:>10} {:>10} {:>10} {}".format("Planned", "Budgeted", "", "Category")
+
+            for category, planned, budgeted, flag in comparison.compare(
+                    plannedByAccount, BUDGET_TOLERANCE):
+                print "{:>10} {:>10} {:>10} {}".format(planned, budgeted, flag, category)
+            # end for
+        # end for
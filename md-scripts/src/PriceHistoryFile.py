@@ -0,0 +1,205 @@
+# Save every security's price history to a compact binary file that loads without parsing
+import logging
+import struct
+from array import array
+from time import time
+
+from com.infinitekind.moneydance.model import AccountBook, CurrencySnapshot, CurrencyTable
+from typing import Dict, List, Tuple
+
+from CacheDir import CacheDir
+from Configure import Configure
+
+
+class PriceHistoryFile(object):
+    """Class to read a price history file: a header, a per-ticker index of
+    offset and count, then all the int dates and all the double rates, each
+    in one big-endian column"""
+
+    MAGIC = "MDPH"
+    VERSION = 1
+    # magic, version, number of tickers, number of price points
+    HEADER = struct.Struct(">4siii")
+    # offset and count of one ticker's points, after its length-prefixed name
+    INDEX_ENTRY = struct.Struct(">ii")
+    # arrays convert to and from bytes in this order; Jython's may differ from sys.byteorder
+    ARRAYS_BIG_ENDIAN = array("i", [1]).tostring()[0] == "\0"
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self.index = {}  # type: Dict[str, Tuple[int, int]]
+        self.numPoints = 0
+        self.datesStart = 0
+        self.ratesStart = 0
+        # an mmap, or a java.nio.MappedByteBuffer on Jython
+        self.mapped = None
+        self.javaMapped = False
+    # end __init__(str)
+
+    @staticmethod
+    def export(currencies, path):
+        # type: (CurrencyTable, str) -> int
+        """Write the snapshots of every security with a ticker symbol to a
+        file, skipping any later security with a ticker already written, so
+        each ticker's history loads back; return the number of price points
+        written."""
+        index = []  # type: List[Tuple[str, int, int]]
+        written = set()
+        dateInts = array("i")
+        rates = array("d")
+
+        for security in currencies.getAllCurrencies():
+            ticker = security.getTickerSymbol()  # type: str
+            snapshots = security.getSnapshots()  # type: List[CurrencySnapshot]
+
+            if ticker and snapshots:
+                if ticker in written:
+                    logging.warning("Skipping %s; another security with ticker %s was"
+                                    " already exported", security.getName(), ticker)
+                    continue
+                written.add(ticker)
+                index.append((ticker, len(dateInts), len(snapshots)))
+
+                for snapshot in snapshots:
+                    dateInts.append(snapshot.getDateInt())
+                    rates.append(snapshot.getRate())
+                # end for
+        # end for
+        header = [PriceHistoryFile.HEADER.pack(
+            PriceHistoryFile.MAGIC, PriceHistoryFile.VERSION, len(index), len(dateInts))]
+
+        for ticker, offset, count in index:
+            name = ticker.encode("utf-8")
+            header.append(struct.pack(">h", len(name)) + name)
+            header.append(PriceHistoryFile.INDEX_ENTRY.pack(offset, count))
+        # end for
+        header = "".join(header)
+        # start the columns on an 8-byte boundary
+        header += "\0" * (-len(header) % 8)
+
+        if not PriceHistoryFile.ARRAYS_BIG_ENDIAN:
+            dateInts.byteswap()
+            rates.byteswap()
+
+        with open(path, "wb") as historyFile:
+            historyFile.write(header)
+            historyFile.write(dateInts.tostring())
+            historyFile.write(rates.tostring())
+
+        return len(dateInts)
+    # end export(CurrencyTable, str)
+
+    def load(self):
+        # type: () -> None
+        """Map our file into memory and read its index; the price columns
+        are read only when a ticker's history is asked for."""
+        try:
+            import mmap
+        except ImportError:
+            # Jython has no mmap module, so map the file with java.nio
+            from java.io import RandomAccessFile
+            from java.nio.channels import FileChannel
+
+            randomAccessFile = RandomAccessFile(self.path, "r")
+
+            try:
+                channel = randomAccessFile.getChannel()
+                self.mapped = channel.map(FileChannel.MapMode.READ_ONLY, 0, channel.size())
+                self.javaMapped = True
+            finally:
+                randomAccessFile.close()
+        else:
+            with open(self.path, "rb") as historyFile:
+                self.mapped = mmap.mmap(historyFile.fileno(), 0, access=mmap.ACCESS_READ)
+        readBytes = self.readBytes
+        magic, version, numTickers, self.numPoints = PriceHistoryFile.HEADER.unpack(
+            readBytes(0, PriceHistoryFile.HEADER.size))
+
+        if magic != PriceHistoryFile.MAGIC or version != PriceHistoryFile.VERSION:
+            raise ValueError("Not a version {} price history file: {}".format(
+                PriceHistoryFile.VERSION, self.path))
+        position = PriceHistoryFile.HEADER.size
+
+        for _ in range(numTickers):
+            nameLen = struct.unpack(">h", readBytes(position, 2))[0]
+            ticker = readBytes(position + 2, nameLen).decode("utf-8")
+            position += 2 + nameLen
+            self.index[ticker] = PriceHistoryFile.INDEX_ENTRY.unpack(
+                readBytes(position, PriceHistoryFile.INDEX_ENTRY.size))
+            position += PriceHistoryFile.INDEX_ENTRY.size
+        # end for
+        self.datesStart = position + -position % 8
+        self.ratesStart = self.datesStart + 4 * self.numPoints
+    # end load()
+
+    def readBytes(self, start, length):
+        # type: (int, int) -> str
+        """Copy a range of our mapped file out in one bulk read."""
+        if not self.javaMapped:
+            return self.mapped[start:start + length]
+        from jarray import zeros
+
+        chunk = zeros(length, "b")
+        view = self.mapped.duplicate()
+        view.position(start)
+        view.get(chunk)
+
+        return chunk.tostring()
+    # end readBytes(int, int)
+
+    def getTickers(self):
+        # type: () -> List[str]
+        return sorted(self.index)
+    # end getTickers()
+
+    def getHistory(self, ticker):
+        # type: (str) -> Tuple[array, array]
+        """Get the date ints and rates of a ticker's snapshots, in the order
+        they were exported."""
+        offset, count = self.index[ticker]
+        dateInts = array("i")
+        dateInts.fromstring(self.readBytes(self.datesStart + 4 * offset, 4 * count))
+        rates = array("d")
+        rates.fromstring(self.readBytes(self.ratesStart + 8 * offset, 8 * count))
+
+        if not PriceHistoryFile.ARRAYS_BIG_ENDIAN:
+            dateInts.byteswap()
+            rates.byteswap()
+
+        return dateInts, rates
+    # end getHistory(str)
+
+    def close(self):
+        # type: () -> None
+        if self.mapped is not None and not self.javaMapped:
+            self.mapped.close()
+        # the JVM unmaps a MappedByteBuffer once it is garbage collected
+        self.mapped = None
+    # end close()
+
+# end class PriceHistoryFile
+
+
+Configure.logToSysErr()
+
+# where to write the price history; None for the user's cache directory
+EXPORT_PATH = None
+
+if "moneydance" in globals():
+    global moneydance
+    accountBook = moneydance.getCurrentAccountBook()  # type: AccountBook
+    exportPath = EXPORT_PATH or CacheDir.bookPath("prices", accountBook, "bin")
+    CacheDir.makeParent(exportPath)
+    startTime = time()
+    numPoints = PriceHistoryFile.export(accountBook.getCurrencies(), exportPath)
+    logging.info("Exported %d price points to %s in %.3f s",
+                 numPoints, exportPath, time() - startTime)
+    startTime = time()
+    priceHistory = PriceHistoryFile(exportPath)
+    priceHistory.load()
+    numLoaded = sum(len(priceHistory.getHistory(ticker)[0])
+                    for ticker in priceHistory.getTickers())
+    priceHistory.close()
+    logging.info("Loaded %d price points for %d tickers back in %.3f s",
+                 numLoaded, len(priceHistory.index), time() - startTime)
@@ -0,0 +1,133 @@
+# Totals of planned spending, kept in minor units of each currency
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+
+from com.infinitekind.moneydance.model import Account, CurrencyType
+from typing import Dict, List, Optional
+
+
+class AccountInfo(object):
+    """Class to hold the account details we need for each split to that account"""
+
+    def __init__(self, account):
+        # type: (Account) -> None
+        self.account = account
+        self.accountType = account.getAccountType()  # type: Account.AccountType
+        self.currency = account.getCurrencyType()  # type: CurrencyType
+        self.decimalPlaces = self.currency.getDecimalPlaces()  # type: int
+        self.scale = Decimal(1).scaleb(-self.decimalPlaces)
+        # multiplier to the book's base currency, and that currency's scale
+        self.rate = Decimal(1)
+        self.baseScale = self.scale
+        # full name of this account, and of this category and its parent
+        # categories, when needed
+        self.fullName = None  # type: Optional[str]
+        self.categoryPath = None  # type: Optional[List[str]]
+    # end __init__(Account)
+
+# end class AccountInfo
+
+
+class ReminderGroup(object):
+    """Class to hold a group of planned reminders that have the same core description"""
+
+    def __init__(self, description, numBuckets=0):
+        # type: (str, int) -> None
+        self.descCore = description  # type: str
+        self.numBuckets = numBuckets
+        # totals are kept in minor units of each currency until rendered
+        self.minorTotals = {}  # type: Dict[CurrencyType, int]
+        self.bucketMinorTotals = {}  # type: Dict[CurrencyType, List[int]]
+        self.scales = {}  # type: Dict[CurrencyType, Decimal]
+        # rates to the base currency used for each of our currencies
+        self.rates = {}  # type: Dict[CurrencyType, Decimal]
+        self.baseScale = None  # type: Optional[Decimal]
+        self.numSplits = 0
+    # end __init__(str, int)
+
+    @property
+    def annualTotal(self):
+        # type: () -> Decimal
+        return sum((self.toBase(total, currency)
+                    for currency, total in self.minorTotals.items()), Decimal(0))
+    # end annualTotal()
+
+    @property
+    def bucketTotals(self):
+        # type: () -> List[Decimal]
+        return [sum((self.toBase(totals[i], currency)
+                     for currency, totals in self.bucketMinorTotals.items() if totals[i]),
+                    Decimal(0))
+                for i in range(self.numBuckets)]
+    # end bucketTotals()
+
+    @property
+    def rateTag(self):
+        # type: () -> str
+        """Describe the rates used to convert any foreign currencies."""
+        return ", ".join("{} @ {:.6f}".format(currency.getIDString(), rate)
+                         for currency, rate in sorted(self.rates.items(),
+                                                      key=lambda item: item[0].getIDString())
+                         if rate != 1)
+    # end rateTag()
+
+    def toBase(self, minorUnits, currency):
+        # type: (int, CurrencyType) -> Decimal
+        """Convert a total in minor units of a currency to the base currency."""
+        amount = Decimal(minorUnits) * self.scales[currency]
+        rate = self.rates.get(currency, 1)
+
+        if rate == 1:
+            return amount
+
+        return (amount * rate).quantize(self.baseScale)
+    # end toBase(int, CurrencyType)
+
+    def addReminder(self, spendUnits, accountInfo, occurrences):
+        # type: (int, AccountInfo, List[date]) -> None
+        self.numSplits += 1
+
+        # add nothing without occurrences, so an empty group still totals Decimal(0)
+        if occurrences:
+            self.addUnits(spendUnits * len(occurrences), accountInfo)
+    # end addReminder(int, AccountInfo, List[date])
+
+    def addUnits(self, minorUnits, accountInfo):
+        # type: (int, AccountInfo) -> None
+        """Add minor units of an account's currency to our total."""
+        currency = accountInfo.currency
+        self.scales[currency] = accountInfo.scale
+        self.rates[currency] = accountInfo.rate
+        self.baseScale = accountInfo.baseScale
+        self.minorTotals[currency] = self.minorTotals.get(currency, 0) + minorUnits
+    # end addUnits(int, AccountInfo)
+
+    def removeReminder(self, spendUnits, accountInfo, occurrences):
+        # type: (int, AccountInfo, List[date]) -> None
+        """Take back exactly what an earlier addReminder added."""
+        self.numSplits -= 1
+
+        if occurrences:
+            currency = accountInfo.currency
+            self.minorTotals[currency] -= spendUnits * len(occurrences)
+
+            if not self.minorTotals[currency]:
+                del self.minorTotals[currency]
+    # end removeReminder(int, AccountInfo, List[date])
+
+    def addReminderByBucket(self, spendUnits, accountInfo, occurrences, bucketStarts):
+        # type: (int, AccountInfo, List[date], List[date]) -> None
+        """Add our spend amount to the bucket each occurrence falls in."""
+        self.addReminder(spendUnits, accountInfo, occurrences)
+
+        if occurrences:
+            bucketTotals = self.bucketMinorTotals.setdefault(
+                accountInfo.currency, [0] * self.numBuckets)
+
+            for occurrence in occurrences:
+                bucketTotals[bisect_right(bucketStarts, occurrence) - 1] += spendUnits
+            # end for
+    # end addReminderByBucket(int, AccountInfo, List[date], List[date])
+
+# end class ReminderGroup
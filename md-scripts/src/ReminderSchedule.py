@@ -0,0 +1,386 @@
+# Work out the dates a reminder occurs on without asking about every single day
+import logging
+from calendar import monthrange
+from datetime import date, timedelta
+from random import Random
+
+from com.infinitekind.moneydance.model import Reminder
+from typing import Iterator, List, Optional, Tuple
+
+from DateAdapter import DateAdapter
+
+
+class ReminderSchedule(object):
+    """Class to find the dates a reminder occurs on within a horizon"""
+
+    ONE_DAY = timedelta(days=1)
+
+    # rule shapes, from cheapest to most expensive to evaluate
+    ONE_TIME = "one-time"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+    JUMP = "jump"
+    PROBE = "probe"
+
+    def __init__(self, reminder):
+        # type: (Reminder) -> None
+        self.reminder = reminder
+        self.initialDateInt = reminder.getInitialDateInt()  # type: int
+        self.lastDateInt = reminder.getLastDateInt()  # type: int
+        self.repeatDaily = reminder.getRepeatDaily()  # type: int
+        self.weeklyDays = list(reminder.getRepeatWeeklyDays() or ())  # type: List[int]
+        self.weeklyModifier = reminder.getRepeatWeeklyModifier()  # type: int
+        self.monthlyDays = list(reminder.getRepeatMonthly() or ())  # type: List[int]
+        self.monthlyModifier = reminder.getRepeatMonthlyModifier()  # type: int
+        self.repeatYearly = bool(reminder.getRepeatYearly())
+        self.bridgeCalls = 8  # Java calls made on this reminder, counting the getters above
+        self.initialDate = None  # type: Optional[date]
+
+        if ReminderSchedule.isValidDateInt(self.initialDateInt):
+            self.initialDate = ReminderSchedule.intToDate(self.initialDateInt)
+        self.shape = self.classify()  # type: str
+    # end __init__(Reminder)
+
+    def classify(self):
+        # type: () -> str
+        """Decide which of our rule shapes this reminder's schedule has."""
+        if self.initialDate is None:
+            return ReminderSchedule.PROBE
+        ruleParts = [self.repeatDaily > 0, bool(self.weeklyDays),
+                     bool(self.monthlyDays), self.repeatYearly]
+
+        if not any(ruleParts):
+            return ReminderSchedule.ONE_TIME
+
+        if ruleParts.count(True) > 1:
+            return ReminderSchedule.PROBE
+
+        if self.repeatDaily > 0:
+            return ReminderSchedule.DAILY
+
+        if self.weeklyDays:
+            if any(day < 1 or day > 7 for day in self.weeklyDays):
+                return ReminderSchedule.PROBE
+
+            if self.weeklyModifier == Reminder.WEEKLY_EVERY:
+                return ReminderSchedule.WEEKLY
+
+            return ReminderSchedule.JUMP
+
+        if self.monthlyDays:
+            # how Moneydance treats the 29th through 31st in short months is not
+            # something we want to guess at, so only the unambiguous days qualify
+            if self.monthlyModifier == Reminder.MONTHLY_EVERY and all(
+                    1 <= day <= 28 or day == Reminder.LAST_DAY_OF_MONTH
+                    for day in self.monthlyDays):
+                return ReminderSchedule.MONTHLY
+
+            return ReminderSchedule.JUMP
+
+        if self.initialDate.month == 2 and self.initialDate.day == 29:
+            return ReminderSchedule.JUMP
+
+        return ReminderSchedule.YEARLY
+    # end classify()
+
+    def getWindow(self, startDate, endDate):
+        # type: (date, date) -> Tuple[date, date]
+        """Clip the half-open range [startDate, endDate) to this reminder's life."""
+        return ReminderSchedule.lifeWindow(
+            self.initialDateInt, self.lastDateInt, startDate, endDate)
+    # end getWindow(date, date)
+
+    @staticmethod
+    def lifeWindow(initialDateInt, lastDateInt, startDate, endDate):
+        # type: (int, int, date, date) -> Tuple[date, date]
+        """Clip the half-open range [startDate, endDate) to the life of a
+        reminder with these initial and last date ints."""
+        if ReminderSchedule.isValidDateInt(initialDateInt):
+            initialDate = ReminderSchedule.intToDate(initialDateInt)
+
+            if initialDate > startDate:
+                startDate = initialDate
+
+        if ReminderSchedule.isValidDateInt(lastDateInt):
+            lastDate = ReminderSchedule.intToDate(lastDateInt)
+
+            if lastDate < endDate:
+                endDate = lastDate + ReminderSchedule.ONE_DAY
+
+        return startDate, endDate
+    # end lifeWindow(int, int, date, date)
+
+    def occurrenceDates(self, startDate, endDate):
+        # type: (date, date) -> List[date]
+        """Get the dates in [startDate, endDate) on which this reminder occurs."""
+        return list(self.iterOccurrences(startDate, endDate))
+    # end occurrenceDates(date, date)
+
+    def iterOccurrences(self, startDate, endDate):
+        # type: (date, date) -> Iterator[date]
+        """Generate the dates in [startDate, endDate) on which this reminder
+        occurs, in order, working out each one only when it is needed."""
+        if self.shape == ReminderSchedule.PROBE:
+            dates = self.probeDates(startDate, endDate)
+        elif self.shape == ReminderSchedule.JUMP:
+            dates = self.jumpDates(startDate, endDate)
+        else:
+            lo, hi = self.getWindow(startDate, endDate)
+
+            if lo >= hi:
+                return
+
+            if self.shape == ReminderSchedule.ONE_TIME:
+                if lo <= self.initialDate < hi:
+                    yield self.initialDate
+
+                return
+
+            if self.shape == ReminderSchedule.DAILY:
+                dates = self.dailyDates(lo, hi)
+            elif self.shape == ReminderSchedule.WEEKLY:
+                dates = self.weeklyDates(lo, hi)
+            elif self.shape == ReminderSchedule.MONTHLY:
+                dates = self.monthlyDates(lo, hi)
+            else:
+                dates = self.yearlyDates(lo, hi)
+
+            if lo <= self.initialDate < hi:
+                dates = self.withInitialDate(dates)
+
+        for dt in dates:
+            yield dt
+        # end for
+    # end iterOccurrences(date, date)
+
+    def countOccurrences(self, startDate, endDate):
+        # type: (date, date) -> int
+        """Count the times this reminder occurs in [startDate, endDate)."""
+        if self.shape not in (ReminderSchedule.DAILY, ReminderSchedule.WEEKLY):
+            return len(self.occurrenceDates(startDate, endDate))
+        lo, hi = self.getWindow(startDate, endDate)
+
+        if lo >= hi:
+            return 0
+
+        if self.shape == ReminderSchedule.DAILY:
+            first = lo + timedelta(days=-(lo - self.initialDate).days % self.repeatDaily)
+            count = 0 if first >= hi else ((hi - first).days - 1) // self.repeatDaily + 1
+
+            return count
+
+        numDays = (hi - lo).days
+        count = numDays // 7 * len(set(self.weeklyDays))
+        remainder = lo + timedelta(days=numDays // 7 * 7)
+
+        while remainder < hi:
+            if ReminderSchedule.javaDayOfWeek(remainder) in self.weeklyDays:
+                count += 1
+            remainder += ReminderSchedule.ONE_DAY
+        # end while
+
+        if lo <= self.initialDate < hi \
+                and ReminderSchedule.javaDayOfWeek(self.initialDate) not in self.weeklyDays \
+                and self.occursOn(self.initialDate):
+            count += 1
+
+        return count
+    # end countOccurrences(date, date)
+
+    def dailyDates(self, lo, hi):
+        # type: (date, date) -> Iterator[date]
+        step = timedelta(days=self.repeatDaily)
+        curDate = lo + timedelta(days=-(lo - self.initialDate).days % self.repeatDaily)
+
+        while curDate < hi:
+            yield curDate
+            curDate += step
+        # end while
+    # end dailyDates(date, date)
+
+    def weeklyDates(self, lo, hi):
+        # type: (date, date) -> Iterator[date]
+        offsets = [timedelta(days=offset) for offset in range(7)
+                   if ReminderSchedule.javaDayOfWeek(lo + timedelta(days=offset)) in self.weeklyDays]
+        weekStart = lo
+
+        while weekStart < hi:
+            for offset in offsets:
+                curDate = weekStart + offset
+
+                if curDate >= hi:
+                    return
+                yield curDate
+            # end for
+            weekStart += timedelta(days=7)
+        # end while
+    # end weeklyDates(date, date)
+
+    def monthlyDates(self, lo, hi):
+        # type: (date, date) -> Iterator[date]
+        year, month = lo.year, lo.month
+
+        while date(year, month, 1) < hi:
+            lastDay = monthrange(year, month)[1]
+            days = set(lastDay if day == Reminder.LAST_DAY_OF_MONTH else day
+                       for day in self.monthlyDays)
+
+            for day in sorted(days):
+                curDate = date(year, month, day)
+
+                if lo <= curDate < hi:
+                    yield curDate
+            # end for
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        # end while
+    # end monthlyDates(date, date)
+
+    def yearlyDates(self, lo, hi):
+        # type: (date, date) -> Iterator[date]
+        for year in range(lo.year, hi.year + 1):
+            curDate = date(year, self.initialDate.month, self.initialDate.day)
+
+            if lo <= curDate < hi:
+                yield curDate
+        # end for
+    # end yearlyDates(date, date)
+
+    def withInitialDate(self, dates):
+        # type: (Iterator[date]) -> Iterator[date]
+        """Ask Moneydance once about an initial date at the start of our window
+        when our rule does not produce it."""
+        firstDate = next(dates, None)
+
+        if firstDate != self.initialDate and self.occursOn(self.initialDate):
+            yield self.initialDate
+
+        if firstDate is not None:
+            yield firstDate
+
+        for dt in dates:
+            yield dt
+        # end for
+    # end withInitialDate(Iterator[date])
+
+    def jumpDates(self, startDate, endDate):
+        # type: (date, date) -> Iterator[date]
+        """Step from occurrence to occurrence using Moneydance's getNextOccurance."""
+        lo, hi = self.getWindow(startDate, endDate)
+        queryDate = lo - ReminderSchedule.ONE_DAY
+        lastDate = None  # type: Optional[date]
+
+        while queryDate < hi:
+            queryDateInt = ReminderSchedule.dateToInt(queryDate)
+            self.bridgeCalls += 1
+            nextDateInt = self.reminder.getNextOccurance(queryDateInt)
+
+            if nextDateInt == queryDateInt:
+                # an inclusive answer, so the query date itself occurs
+                if queryDate >= lo and queryDate != lastDate:
+                    lastDate = queryDate
+                    yield queryDate
+                queryDate += ReminderSchedule.ONE_DAY
+            elif nextDateInt > queryDateInt and ReminderSchedule.isValidDateInt(nextDateInt):
+                queryDate = ReminderSchedule.intToDate(nextDateInt)
+
+                if queryDate < hi:
+                    lastDate = queryDate
+                    yield queryDate
+            else:
+                break
+        # end while
+    # end jumpDates(date, date)
+
+    def probeDates(self, startDate, endDate):
+        # type: (date, date) -> Iterator[date]
+        """Ask Moneydance about every day in [startDate, endDate)."""
+        curDate = startDate
+
+        for cal in DateAdapter.iterCalendars(startDate, endDate):
+            self.bridgeCalls += 1
+
+            if self.reminder.occursOnDate(cal):
+                yield curDate
+
+            curDate += ReminderSchedule.ONE_DAY
+        # end for
+    # end probeDates(date, date)
+
+    def occursOn(self, dt):
+        # type: (date) -> bool
+        self.bridgeCalls += 1
+
+        return self.reminder.occursOnDate(DateAdapter.calendarFor(dt))
+    # end occursOn(date)
+
+    @staticmethod
+    def verifyAgainstProbing(reminders, startDate, endDate, sampleSize, seed=None):
+        # type: (List[Reminder], date, date, int, Optional[int]) -> int
+        """Compare our counts to day-by-day probing on a random sample of
+        reminders and sub-ranges; log and return the number of mismatches."""
+        rand = Random(seed)
+        numDays = (endDate - startDate).days
+        sample = rand.sample(reminders, min(sampleSize, len(reminders)))
+        mismatches = 0
+
+        for remind in sample:
+            schedule = ReminderSchedule(remind)
+            lo = startDate + timedelta(days=rand.randint(0, numDays - 1))
+            hi = lo + timedelta(days=rand.randint(1, (endDate - lo).days))
+            probed = list(schedule.probeDates(lo, hi))
+            computed = schedule.occurrenceDates(lo, hi)
+            counted = schedule.countOccurrences(lo, hi)
+
+            if computed != probed or counted != len(probed):
+                mismatches += 1
+                logging.warning("%s (%s) from %s to %s: probing found %d, computed %d,"
+                                " counted %d", remind.getDescription(), schedule.shape,
+                                lo, hi, len(probed), len(computed), counted)
+        # end for
+        logging.info("Verified %d reminder schedules against probing; %d mismatches.",
+                     len(sample), mismatches)
+
+        return mismatches
+    # end verifyAgainstProbing(List[Reminder], date, date, int, Optional[int])
+
+    @staticmethod
+    def addMonths(dt, months):
+        # type: (date, int) -> date
+        """Move a date by whole months, using the last day of the month reached
+        when it is too short (so Feb 29 plus a year is Feb 28)."""
+        year, month = divmod(dt.year * 12 + dt.month - 1 + months, 12)
+        month += 1
+
+        return date(year, month, min(dt.day, monthrange(year, month)[1]))
+    # end addMonths(date, int)
+
+    @staticmethod
+    def isValidDateInt(dateInt):
+        # type: (int) -> bool
+        return 10000101 <= dateInt <= 99991231
+    # end isValidDateInt(int)
+
+    @staticmethod
+    def dateToInt(dt):
+        # type: (date) -> int
+        """Convert a date to Moneydance's yyyymmdd integer form."""
+        return dt.year * 10000 + dt.month * 100 + dt.day
+    # end dateToInt(date)
+
+    @staticmethod
+    def intToDate(dateInt):
+        # type: (int) -> date
+        """Convert a Moneydance yyyymmdd integer to a date."""
+        return date(dateInt // 10000, dateInt // 100 % 100, dateInt % 100)
+    # end intToDate(int)
+
+    @staticmethod
+    def javaDayOfWeek(dt):
+        # type: (date) -> int
+        """Get the java.util.Calendar day of week, Sunday being 1."""
+        return (dt.weekday() + 1) % 7 + 1
+    # end javaDayOfWeek(date)
+
+# end class ReminderSchedule
@@ -0,0 +1,122 @@
+# Places to send a planned-spending report, each written all at once when closed
+import csv
+import json
+from decimal import Decimal
+from StringIO import StringIO
+
+from typing import List, Optional
+
+
+class ReportSink(object):
+    """Class to buffer report lines and print them to the console in a single
+    print on close; subclasses send them elsewhere"""
+
+    def __init__(self):
+        # type: () -> None
+        self.lines = []  # type: List[str]
+    # end __init__()
+
+    @staticmethod
+    def forPath(path=None):
+        # type: (Optional[str]) -> ReportSink
+        """Get a sink for a .txt, .csv or .jsonl file path, or the console when no path."""
+        if not path:
+            return ReportSink()
+
+        if path.lower().endswith(".txt"):
+            return FileSink(path)
+
+        if path.lower().endswith(".csv"):
+            return CsvSink(path)
+
+        if path.lower().endswith(".jsonl"):
+            return JsonLinesSink(path)
+
+        raise ValueError("Report path must end in .txt, .csv or .jsonl: " + path)
+    # end forPath(Optional[str])
+
+    def writeTitle(self, title):
+        # type: (str) -> None
+        self.lines.append(title)
+    # end writeTitle(str)
+
+    def writeRow(self, annualTotal, description):
+        # type: (Decimal, str) -> None
+        self.lines.append("{:>8} {}".format(annualTotal, description))
+    # end writeRow(Decimal, str)
+
+    def close(self):
+        # type: () -> None
+        if self.lines:
+            print "\n".join(self.lines)
+    # end close()
+
+# end class ReportSink
+
+
+class FileSink(ReportSink):
+    """Class to write a report's rows to a text file in one write"""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        super(FileSink, self).__init__()
+        self.path = path
+    # end __init__(str)
+
+    def writeTitle(self, title):
+        # type: (str) -> None
+        """Leave the title out; a report file holds only rows."""
+        pass
+    # end writeTitle(str)
+
+    def close(self):
+        # type: () -> None
+        self.writeFile("".join(line + "\n" for line in self.lines))
+    # end close()
+
+    def writeFile(self, contents):
+        # type: (str) -> None
+        with open(self.path, "wb") as reportFile:
+            reportFile.write(contents.encode("utf-8") if isinstance(contents, unicode)
+                             else contents)
+    # end writeFile(str)
+
+# end class FileSink
+
+
+class CsvSink(FileSink):
+    """Class to write a report as comma separated values"""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        super(CsvSink, self).__init__(path)
+        self.buffer = StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(["annualTotal", "description"])
+    # end __init__(str)
+
+    def writeRow(self, annualTotal, description):
+        # type: (Decimal, str) -> None
+        self.writer.writerow([annualTotal, description.encode("utf-8")])
+    # end writeRow(Decimal, str)
+
+    def close(self):
+        # type: () -> None
+        self.writeFile(self.buffer.getvalue())
+    # end close()
+
+# end class CsvSink
+
+
+class JsonLinesSink(FileSink):
+    """Class to write a report as one JSON object per line"""
+
+    def writeRow(self, annualTotal, description):
+        # type: (Decimal, str) -> None
+        self.lines.append(json.dumps({
+            "description": description,
+            "annualTotal": str(annualTotal)
+        }))
+    # end writeRow(Decimal, str)
+
+# end class JsonLinesSink
@@ -0,0 +1,68 @@
+# Keep the last planned-spending report on disk until the book changes
+import json
+import logging
+import os
+from datetime import date
+from decimal import Decimal
+
+from com.infinitekind.moneydance.model import AccountBook, Reminder
+from typing import Dict, List, Optional, Tuple
+
+from CacheDir import CacheDir
+from ReminderSchedule import ReminderSchedule
+
+
+class ResultCache(object):
+    """Class to hold a finished report keyed on what would change it"""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+    # end __init__(str)
+
+    @staticmethod
+    def forBook(accountBook):
+        # type: (AccountBook) -> ResultCache
+        return ResultCache(CacheDir.bookPath("report", accountBook, "json"))
+    # end forBook(AccountBook)
+
+    @staticmethod
+    def makeKey(accountBook, startDate, variant):
+        # type: (AccountBook, date, str) -> Dict
+        """Get the key of a report; counting reminder items leaves the
+        ReminderSet untouched."""
+        return {
+            "lastModified": accountBook.getLastModified(),
+            "reminders": len(accountBook.getItemsWithType(Reminder.SYNCABLE_TYPE_VALUE)),
+            "start": ReminderSchedule.dateToInt(startDate),
+            "variant": variant
+        }
+    # end makeKey(AccountBook, date, str)
+
+    def get(self, key):
+        # type: (Dict) -> Optional[List[Tuple[Decimal, str]]]
+        """Get the annual total and description of each report row, or None
+        when there is no report for this key."""
+        try:
+            with open(self.path, "r") as cacheFile:
+                contents = json.load(cacheFile)
+
+            if contents["key"] == key:
+                return [(Decimal(total), desc) for total, desc in contents["rows"]]
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self.path):
+                logging.warning("Ignoring report cache %s: %s", self.path, e)
+
+        return None
+    # end get(Dict)
+
+    def put(self, key, rows):
+        # type: (Dict, List[Tuple[Decimal, str]]) -> None
+        CacheDir.makeParent(self.path)
+
+        with open(self.path, "w") as cacheFile:
+            json.dump({"key": key, "rows": [(str(total), desc) for total, desc in rows]},
+                      cacheFile)
+    # end put(Dict, List[Tuple[Decimal, str]])
+
+# end class ResultCache
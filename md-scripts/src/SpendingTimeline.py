@@ -0,0 +1,163 @@
+# Cumulative day-by-day planned spending so any date range is two lookups
+import json
+from array import array
+from datetime import date
+from decimal import Decimal
+
+from typing import Dict, List, Optional, Tuple
+
+from ReminderSchedule import ReminderSchedule
+
+
+class SpendingTimeline(object):
+    """Class to hold cumulative planned spending, in minor units of each
+    currency, for each day of a horizon, per group and in total"""
+
+    def __init__(self, startDate, numDays, decimalPlaces=2):
+        # type: (date, int, int) -> None
+        self.startDate = startDate
+        self.numDays = numDays
+        # decimal places of the base currency
+        self.decimalPlaces = decimalPlaces
+        # running sums by currency ID; element i holds the spending before
+        # day i, so each has numDays + 1
+        self.totalSums = {}  # type: Dict[str, array]
+        self.groupSums = {}  # type: Dict[str, Dict[str, array]]
+        # decimal places and rate to the base currency of each currency ID
+        self.currencies = {}  # type: Dict[str, Tuple[int, Decimal]]
+        self.accumulated = False
+    # end __init__(date, int, int)
+
+    @staticmethod
+    def newSums(numDays):
+        # type: (int) -> array
+        return array("l", [0]) * (numDays + 1)
+    # end newSums(int)
+
+    def addOccurrences(self, description, spendUnits, currencyId, decimalPlaces, rate,
+                       occurrences):
+        # type: (str, int, str, int, Decimal, List[date]) -> None
+        """Add a spend amount, in minor units of a currency with these decimal
+        places and rate to the base currency, on each occurrence date; call
+        before accumulate."""
+        self.currencies[currencyId] = (decimalPlaces, rate)
+        groupSums = self.groupSums.setdefault(description, {})
+
+        if currencyId not in groupSums:
+            groupSums[currencyId] = SpendingTimeline.newSums(self.numDays)
+
+        if currencyId not in self.totalSums:
+            self.totalSums[currencyId] = SpendingTimeline.newSums(self.numDays)
+        sums = groupSums[currencyId]
+        totalSums = self.totalSums[currencyId]
+
+        for occurrence in occurrences:
+            dayIndex = (occurrence - self.startDate).days + 1
+            sums[dayIndex] += spendUnits
+            totalSums[dayIndex] += spendUnits
+        # end for
+    # end addOccurrences(str, int, str, int, Decimal, List[date])
+
+    def accumulate(self):
+        # type: () -> None
+        """Turn the per-day amounts added so far into running sums."""
+        for sums in list(self.totalSums.values()) + [
+                sums for groupSums in self.groupSums.values() for sums in groupSums.values()]:
+            for i in range(1, len(sums)):
+                sums[i] += sums[i - 1]
+            # end for
+        # end for
+        self.accumulated = True
+    # end accumulate()
+
+    def spendingBetween(self, fromDate, toDate, description=None):
+        # type: (date, date, Optional[str]) -> Decimal
+        """Get the planned spending in [fromDate, toDate), for one group when a
+        description is given, otherwise in total; like the report, foreign
+        amounts are converted and rounded per group."""
+        if not self.accumulated:
+            raise ValueError("Timeline has not been accumulated yet")
+        lo = self.dayIndex(fromDate)
+        hi = self.dayIndex(toDate)
+
+        if hi <= lo:
+            return Decimal(0)
+
+        if description is not None:
+            return sum((self.toBase(sums[hi] - sums[lo], currencyId)
+                        for currencyId, sums in self.groupSums[description].items()), Decimal(0))
+        # only the base currency adds up the same in total as per group
+        total = sum((self.toBase(sums[hi] - sums[lo], currencyId)
+                     for currencyId, sums in self.totalSums.items()
+                     if self.currencies[currencyId][1] == 1), Decimal(0))
+
+        for groupSums in self.groupSums.values():
+            total += sum((self.toBase(sums[hi] - sums[lo], currencyId)
+                          for currencyId, sums in groupSums.items()
+                          if self.currencies[currencyId][1] != 1), Decimal(0))
+        # end for
+
+        return total
+    # end spendingBetween(date, date, Optional[str])
+
+    def toBase(self, minorUnits, currencyId):
+        # type: (int, str) -> Decimal
+        """Convert an amount in minor units of a currency to the base currency
+        the way ReminderGroup.toBase converts a report total."""
+        decimalPlaces, rate = self.currencies[currencyId]
+        amount = Decimal(minorUnits).scaleb(-decimalPlaces)
+
+        if rate == 1:
+            return amount
+
+        return (amount * rate).quantize(Decimal(1).scaleb(-self.decimalPlaces))
+    # end toBase(int, str)
+
+    def dayIndex(self, dt):
+        # type: (date) -> int
+        """Get the index of our running sum for the start of a date."""
+        return min(max((dt - self.startDate).days, 0), self.numDays)
+    # end dayIndex(date)
+
+    def save(self, path):
+        # type: (str) -> None
+        with open(path, "w") as timelineFile:
+            json.dump({
+                "start": ReminderSchedule.dateToInt(self.startDate),
+                "numDays": self.numDays,
+                "decimalPlaces": self.decimalPlaces,
+                "currencies": dict((currencyId, (decimalPlaces, str(rate)))
+                                   for currencyId, (decimalPlaces, rate)
+                                   in self.currencies.items()),
+                "total": dict((currencyId, sums.tolist())
+                              for currencyId, sums in self.totalSums.items()),
+                "groups": dict((desc, dict((currencyId, sums.tolist())
+                                           for currencyId, sums in groupSums.items()))
+                               for desc, groupSums in self.groupSums.items())
+            }, timelineFile)
+    # end save(str)
+
+    @staticmethod
+    def load(path):
+        # type: (str) -> SpendingTimeline
+        """Read a timeline saved earlier, ready for range queries."""
+        with open(path, "r") as timelineFile:
+            contents = json.load(timelineFile)
+        timeline = SpendingTimeline(ReminderSchedule.intToDate(contents["start"]),
+                                    contents["numDays"], contents["decimalPlaces"])
+        timeline.currencies = dict((currencyId, (decimalPlaces, Decimal(rate)))
+                                   for currencyId, (decimalPlaces, rate)
+                                   in contents["currencies"].items())
+        timeline.totalSums = dict((currencyId, array("l", sums))
+                                  for currencyId, sums in contents["total"].items())
+
+        for desc, groupSums in contents["groups"].items():
+            timeline.groupSums[desc] = dict((currencyId, array("l", sums))
+                                            for currencyId, sums in groupSums.items())
+        # end for
+        timeline.accumulated = True
+
+        return timeline
+    # end load(str)
+
+# end class SpendingTimeline
@@ -0,0 +1,114 @@
+# Total planned spending under what-if scenarios without asking Moneydance again
+from decimal import Decimal
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ReminderGroup import AccountInfo, ReminderGroup
+
+
+class WhatIfScenario(object):
+    """Class to hold amount, frequency and removal overrides, each keyed by
+    the description of the group it changes"""
+
+    def __init__(self):
+        # type: () -> None
+        self.amountFactors = {}  # type: Dict[str, Decimal]
+        self.amounts = {}  # type: Dict[str, Decimal]
+        self.frequencyFactors = {}  # type: Dict[str, Decimal]
+        self.occurrenceCounts = {}  # type: Dict[str, int]
+        self.removals = set()  # type: Set[str]
+    # end __init__()
+
+    def scaleAmount(self, description, factor):
+        # type: (str, Decimal) -> None
+        """Multiply the amount of each occurrence, e.g. 2 for doubling."""
+        self.amountFactors[description] = Decimal(factor)
+    # end scaleAmount(str, Decimal)
+
+    def setAmount(self, description, amount):
+        # type: (str, Decimal) -> None
+        """Replace the amount of each occurrence, in the account's currency."""
+        self.amounts[description] = Decimal(amount)
+    # end setAmount(str, Decimal)
+
+    def scaleFrequency(self, description, factor):
+        # type: (str, Decimal) -> None
+        """Multiply how often it occurs, e.g. 0.5 for half as often."""
+        self.frequencyFactors[description] = Decimal(factor)
+    # end scaleFrequency(str, Decimal)
+
+    def setOccurrences(self, description, count):
+        # type: (str, int) -> None
+        """Replace how many times it occurs in the horizon."""
+        self.occurrenceCounts[description] = count
+    # end setOccurrences(str, int)
+
+    def remove(self, description):
+        # type: (str) -> None
+        self.removals.add(description)
+    # end remove(str)
+
+# end class WhatIfScenario
+
+
+class WhatIfSimulator(object):
+    """Class to total planned spending under what-if scenarios from occurrence
+    counts gathered once, without asking Moneydance about any more dates"""
+
+    def __init__(self, accessor):
+        # type: (ReminderAccessor) -> None
+        self.accessor = accessor
+        self.splits = [(desc, spendUnits, otherInfo, accessor.countOccurrences(remind))
+                       for remind, desc, spendUnits, otherInfo
+                       in accessor.getSpendingSplits()]  # type: List[Tuple[str, int, AccountInfo, int]]
+        self.numEvaluations = 0
+    # end __init__(ReminderAccessor)
+
+    def evaluate(self, scenario=None):
+        # type: (Optional[WhatIfScenario]) -> List[ReminderGroup]
+        """Get the groups planned spending would have under a scenario, or as
+        it stands when no scenario."""
+        scenario = scenario or WhatIfScenario()
+        groups = {}  # type: Dict[str, ReminderGroup]
+        self.numEvaluations += 1
+
+        for desc, spendUnits, otherInfo, numOccurrences in self.splits:
+            if desc in scenario.removals:
+                continue
+
+            if desc in scenario.amounts:
+                spendUnits = int((scenario.amounts[desc] / otherInfo.scale).to_integral_value())
+            elif desc in scenario.amountFactors:
+                spendUnits = int((spendUnits * scenario.amountFactors[desc]).to_integral_value())
+
+            if desc in scenario.occurrenceCounts:
+                numOccurrences = scenario.occurrenceCounts[desc]
+            elif desc in scenario.frequencyFactors:
+                numOccurrences = int(
+                    (numOccurrences * scenario.frequencyFactors[desc]).to_integral_value())
+
+            if desc not in groups:
+                groups[desc] = ReminderGroup(desc)
+            reminderGroup = groups[desc]
+            reminderGroup.numSplits += 1
+
+            if numOccurrences:
+                reminderGroup.addUnits(spendUnits * numOccurrences, otherInfo)
+        # end for
+
+        return list(groups.values())
+    # end evaluate(Optional[WhatIfScenario])
+
+    def compare(self, scenario):
+        # type: (WhatIfScenario) -> List[Tuple[str, Decimal, Decimal]]
+        """Get the description, current total and scenario total of each group
+        the scenario changes."""
+        current = dict((spend.descCore, spend.annualTotal) for spend in self.evaluate())
+        changed = dict((spend.descCore, spend.annualTotal) for spend in self.evaluate(scenario))
+
+        return [(desc, current.get(desc, Decimal(0)), changed.get(desc, Decimal(0)))
+                for desc in sorted(set(current) | set(changed))
+                if current.get(desc) != changed.get(desc)]
+    # end compare(WhatIfScenario)
+
+# end class WhatIfSimulator
@@ -1,39 +1,241 @@
-
 import logging
+from bisect import bisect_left, bisect_right
+from time import time
 
 from com.infinitekind.moneydance.model import Account, AccountBook, CurrencySnapshot
 from com.infinitekind.moneydance.model import CurrencyTable, CurrencyType
-from typing import List
+from java.util.concurrent import Callable, Executors
+from typing import Dict, List, Optional, Tuple
 
 from Configure import Configure
 
 
+class SnapshotCopier(Callable):
+    """Class to mirror the price snapshots of one security to another"""
+
+    def __init__(self, sourceSecurity, destSecurity, fromDate=0, toDate=0):
+        # type: (CurrencyType, CurrencyType, int, int) -> None
+        self.sourceSecurity = sourceSecurity
+        self.destSecurity = destSecurity
+        self.fromDate = fromDate
+        self.toDate = toDate
+        self.newSnapshots = []  # type: List[CurrencySnapshot]
+        self.changedSnapshots = []  # type: List[CurrencySnapshot]
+        self.latestRate = None  # type: Optional[float]
+        self.elapsed = 0.0
+    # end __init__(CurrencyType, CurrencyType, int, int)
+
+    def findChanges(self):
+        # type: () -> Tuple[List[CurrencySnapshot], Optional[float]]
+        """Get the source snapshots in our date window that are missing or
+        have a different rate in the destination, and the latest source rate
+        when our window includes it."""
+        # sorting is linear when the snapshots already come in date order
+        sourceSnapshots = sorted(self.sourceSecurity.getSnapshots(),
+                                 key=lambda snapshot: snapshot.getDateInt())  # type: List[CurrencySnapshot]
+        sourceDateInts = [snapshot.getDateInt() for snapshot in sourceSnapshots]
+        windowSnapshots = sourceSnapshots[
+            bisect_left(sourceDateInts, self.fromDate) if self.fromDate else 0:
+            bisect_right(sourceDateInts, self.toDate) if self.toDate else len(sourceSnapshots)]
+        destRates = dict((snapshot.getDateInt(), snapshot.getRate())
+                         for snapshot in self.destSecurity.getSnapshots())  # type: Dict[int, float]
+        changedSnapshots = [snapshot for snapshot in windowSnapshots
+                            if destRates.get(snapshot.getDateInt()) != snapshot.getRate()]
+
+        latestRate = None  # type: Optional[float]
+
+        if windowSnapshots and windowSnapshots[-1] is sourceSnapshots[-1]:
+            # only the latest price sets the current rate
+            latestRate = windowSnapshots[-1].getRate()
+
+        return changedSnapshots, latestRate
+    # end findChanges()
+
+    def call(self):
+        # type: () -> SnapshotCopier
+        """Find the missing or changed snapshots without writing anything, so
+        copiers can look for changes on concurrent threads."""
+        startTime = time()
+        self.changedSnapshots, self.latestRate = self.findChanges()
+        self.elapsed += time() - startTime
+
+        return self
+    # end call()
+
+    def writeChanges(self, accountBook, batchSize):
+        # type: (AccountBook, int) -> None
+        """Write the snapshots call found in chunks of batchSize, logging each
+        chunk's modified items before writing the next; only call this on the
+        thread that owns the account book, with its syncing paused."""
+        startTime = time()
+
+        for chunkStart in range(0, len(self.changedSnapshots), batchSize):
+            chunk = self.changedSnapshots[chunkStart:chunkStart + batchSize]
+            newSnapshots = [self.destSecurity.setSnapshotInt(
+                sourceSnapshot.getDateInt(), sourceSnapshot.getRate())
+                for sourceSnapshot in chunk]  # type: List[CurrencySnapshot]
+            accountBook.logModifiedItems(newSnapshots)
+            self.newSnapshots.extend(newSnapshots)
+            logging.info("Copied %s (%s) prices from %i through %i",
+                         self.sourceSecurity.getName(), self.sourceSecurity.getTickerSymbol(),
+                         chunk[0].getDateInt(), chunk[-1].getDateInt())
+        # end for
+
+        if self.latestRate is not None:
+            self.destSecurity.setRelativeRate(self.latestRate)
+        self.elapsed += time() - startTime
+    # end writeChanges(AccountBook, int)
+
+    def copyEach(self):
+        # type: () -> None
+        """Write and sync the missing or changed snapshots one at a time."""
+        startTime = time()
+        changedSnapshots, latestRate = self.findChanges()
+
+        for sourceSnapshot in changedSnapshots:
+            ssDateInt = sourceSnapshot.getDateInt()  # type: int
+            ssRate = sourceSnapshot.getRate()
+            logging.info("On %i %s (%s) closed at $%0.8f", ssDateInt,
+                         self.sourceSecurity.getName(), self.sourceSecurity.getTickerSymbol(),
+                         1 / ssRate)
+
+            newSnapshot = self.destSecurity.setSnapshotInt(ssDateInt, ssRate)
+            newSnapshot.syncItem()
+            self.newSnapshots.append(newSnapshot)
+        # end for
+
+        if latestRate is not None:
+            self.destSecurity.setRelativeRate(latestRate)
+        self.elapsed = time() - startTime
+    # end copyEach()
+
+    def logSummary(self):
+        # type: () -> None
+        logging.info("%s (%s) -> %s (%s): copied %d snapshots in %.3f s (%.0f per second)",
+                     self.sourceSecurity.getName(), self.sourceSecurity.getTickerSymbol(),
+                     self.destSecurity.getName(), self.destSecurity.getTickerSymbol(),
+                     len(self.newSnapshots), self.elapsed,
+                     len(self.newSnapshots) / self.elapsed if self.elapsed else 0.0)
+    # end logSummary()
+
+    @staticmethod
+    def readPairs(path=None):
+        # type: (Optional[str]) -> List[Tuple[str, str]]
+        """Read source and destination ticker pairs, one pair per line
+        separated by white space or a comma; # starts a comment."""
+        if not path:
+            return [("FSPSX", "FSIVX")]
+        pairs = []
+
+        with open(path, "r") as pairsFile:
+            for line in pairsFile:
+                fields = line.split("#", 1)[0].replace(",", " ").split()
+
+                if len(fields) == 2:
+                    pairs.append((fields[0], fields[1]))
+                elif fields:
+                    logging.warning("Ignoring pairs file line: %s", line.strip())
+            # end for
+
+        return pairs
+    # end readPairs(Optional[str])
+
+    @staticmethod
+    def rejectConflicts(pairs):
+        # type: (List[Tuple[str, str]]) -> List[Tuple[str, str]]
+        """Get the pairs that write a security no other pair reads or writes,
+        keeping the first of any conflicting pairs; a chain like A -> B,
+        B -> C would copy B before or after A's snapshots reach it."""
+        sources = set()
+        destinations = set()
+        kept = []
+
+        for sourceTicker, destTicker in pairs:
+            if sourceTicker == destTicker or destTicker in sources \
+                    or destTicker in destinations or sourceTicker in destinations:
+                logging.warning("Skipping pair %s -> %s; it shares a security with a pair"
+                                " that writes it", sourceTicker, destTicker)
+                continue
+            sources.add(sourceTicker)
+            destinations.add(destTicker)
+            kept.append((sourceTicker, destTicker))
+        # end for
+
+        return kept
+    # end rejectConflicts(List[Tuple[str, str]])
+
+# end class SnapshotCopier
+
+
 Configure.logToSysErr()
 
+# number of snapshots to write between sync log entries; 0 syncs each snapshot
+BATCH_SIZE = 500
+# yyyymmdd dates of the first and last source snapshots to copy; 0 for no limit
+FROM_DATE = 0
+TO_DATE = 0
+# file of source and destination ticker pairs; None copies FSPSX to FSIVX
+PAIRS_PATH = None
+# set to True to find each pair's changes on concurrent threads when batching
+CONCURRENT = False
+
 if "moneydance" in globals():
     global moneydance
     accountBook = moneydance.getCurrentAccountBook()  # type: AccountBook
     root = accountBook.getRootAccount()  # type: Account
     securities = accountBook.getCurrencies()  # type: CurrencyTable
-    sourceSecurity = securities.getCurrencyByTickerSymbol("FSPSX")  # type: CurrencyType
-    destSecurity = securities.getCurrencyByTickerSymbol("FSIVX")  # type: CurrencyType
-    logging.info("Copying price snapshots to %s (%s)",
-                 destSecurity.getName(), destSecurity.getTickerSymbol())
-    sourceSnapshots = sourceSecurity.getSnapshots()  # type: List[CurrencySnapshot]
-    ssRate = 1.0
-
-    for sourceSnapshot in sourceSnapshots:
-        ssDateInt = sourceSnapshot.getDateInt()  # type: int
-        ssRate = sourceSnapshot.getRate()
-        logging.info("On %i %s (%s) closed at $%0.8f", ssDateInt,
-                     sourceSecurity.getName(), sourceSecurity.getTickerSymbol(),
-                     1 / ssRate)
-
-        newSnapshot = destSecurity.setSnapshotInt(ssDateInt, ssRate)
-        newSnapshot.syncItem()
+    # one pass over the currency table instead of a lookup per ticker
+    tickerIndex = dict((security.getTickerSymbol(), security)
+                       for security in securities.getAllCurrencies()
+                       if security.getTickerSymbol())  # type: Dict[str, CurrencyType]
+    copiers = []  # type: List[SnapshotCopier]
+
+    for sourceTicker, destTicker in SnapshotCopier.rejectConflicts(
+            SnapshotCopier.readPairs(PAIRS_PATH)):
+        if sourceTicker in tickerIndex and destTicker in tickerIndex:
+            copiers.append(SnapshotCopier(tickerIndex[sourceTicker], tickerIndex[destTicker],
+                                          FROM_DATE, TO_DATE))
+        else:
+            logging.warning("Skipping pair %s -> %s; no security has one of these tickers",
+                            sourceTicker, destTicker)
     # end for
+    logging.info("Copying price snapshots for %d pairs", len(copiers))
+    startTime = time()
+
+    if BATCH_SIZE > 0:
+        # one sync log entry per chunk instead of a sync and undo record per snapshot
+        accountBook.pauseSyncing()
 
-    if sourceSnapshots:
-        destSecurity.setRelativeRate(ssRate)
-        logging.info("Finished updating %s (%s)",
-                     destSecurity.getName(), destSecurity.getTickerSymbol())
+        try:
+            if CONCURRENT and len(copiers) > 1:
+                # the pool only reads snapshots; all writes stay on this thread
+                executor = Executors.newFixedThreadPool(len(copiers))
+
+                try:
+                    for future in executor.invokeAll(copiers):
+                        future.get()  # rethrows any copier failure
+                    # end for
+                finally:
+                    executor.shutdown()
+            else:
+                for copier in copiers:
+                    copier.call()
+                # end for
+
+            for copier in copiers:
+                copier.writeChanges(accountBook, BATCH_SIZE)
+            # end for
+        finally:
+            accountBook.resumeSyncing()
+    else:
+        for copier in copiers:
+            copier.copyEach()
+        # end for
+
+    for copier in copiers:
+        copier.logSummary()
+    # end for
+    numCopied = sum(len(copier.newSnapshots) for copier in copiers)
+    elapsed = time() - startTime
+    logging.info("Copied %d snapshots in %.3f s (%.0f per second)",
+                 numCopied, elapsed, numCopied / elapsed if elapsed else 0.0)